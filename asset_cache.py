@@ -0,0 +1,173 @@
+import pygame._sdl2
+import os
+import mmap
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+
+# set this from the main file in subtitler.main(), same as sub_effects.
+renderer = None
+
+# One shared store of uploaded textures for the whole program. Loaders in sub_effects and subtitler
+# ask for a path here instead of calling pygame.image.load themselves, so six copies of the same
+# animation cost one decode and one upload. Texture state such as alpha is shared too: set it right
+# before drawing, like the main loop already does.
+class TextureCache:
+
+    def __init__(self, budget=512 * 1024 * 1024):
+        self.budget = budget # bytes of (estimated) texture memory before evicting.
+        self.entries = OrderedDict() # (path, scale): (Texture, bytes), oldest first.
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.uploads = 0 # every upload in the program, cached or not. see upload().
+        self.upload_bytes = 0
+        self.opaque = {} # path: no transparent pixel, measured once on load. see opaque().
+
+    def get(self, path, scale=1):
+        key = (os.path.realpath(path), scale)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.entries[key][0]
+        self.misses += 1
+        surface = load_surface(path, scale)
+        if key[0] not in self.opaque:
+            self.opaque[key[0]] = opaque(surface)
+        texture = upload(surface)
+        self.put(key, texture)
+        return texture
+
+    def add(self, path, surface, scale=1, is_opaque=None): # a surface decoded elsewhere, e.g. on a worker thread.
+        key = (os.path.realpath(path), scale)
+        self.opaque[key[0]] = opaque(surface) if is_opaque is None else is_opaque
+        texture = upload(surface)
+        self.put(key, texture)
+        return texture
+
+    def put(self, key, texture):
+        size = texture.width * texture.height * 4 # SDL stores everything as 32-bit.
+        if key in self.entries: # replaced, e.g. by add() after a reload.
+            self.used -= self.entries.pop(key)[1]
+        self.entries[key] = (texture, size)
+        self.used += size
+        self.evict()
+
+    # drop least recently used entries until under budget. objects still holding an evicted
+    # texture keep it alive; the cache just stops handing it out.
+    def evict(self):
+        while self.used > self.budget and len(self.entries) > 1:
+            _, (_, size) = self.entries.popitem(last=False)
+            self.used -= size
+            self.evictions += 1
+
+    def invalidate(self, path):
+        path = os.path.realpath(path)
+        self.opaque.pop(path, None)
+        for key in [key for key in self.entries if key[0] == path]:
+            self.used -= self.entries.pop(key)[1]
+
+    def clear(self):
+        self.entries.clear()
+        self.opaque.clear()
+        self.used = 0
+
+    def report(self):
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        return (f"Texture cache: {len(self.entries)} entries, {self.used / 2**20:.1f} / {self.budget / 2**20:.0f} MB, "
+                f"{self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate), {self.evictions} evictions, "
+                f"{self.uploads} uploads ({self.upload_bytes / 2**20:.1f} MB) in total.")
+
+# Optional store of decoded images on disk, so a PNG is decompressed once and later loads just map
+# the pixels into a Surface. One file per source image: a header with the size, the source file's
+# size and mtime, and the pixels as 32-bit RGBA (RGBX without alpha; colour-keyed images become RGBA
+# with the key transparent). An entry whose source has changed since is ignored and written again.
+# Turn it on with pixel_cache = PixelCache().
+class PixelCache:
+
+    HEADER = struct.Struct("<8sIIIQq") # magic, width, height, has alpha, source size, source mtime.
+    MAGIC = b"SUBPIX02"
+
+    def __init__(self, directory=os.path.dirname(os.path.realpath(__file__)) + "/.cache/pixels/"):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def entry(self, path):
+        return self.directory + hashlib.sha1(os.path.realpath(path).encode()).hexdigest() + ".raw"
+
+    def load(self, path):
+        stat = os.stat(path)
+        entry = self.entry(path)
+        try:
+            with open(entry, "rb") as f:
+                pixels = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY) # stays mapped after close.
+            magic, w, h, alpha, size, mtime = self.HEADER.unpack_from(pixels)
+            if magic == self.MAGIC and (size, mtime) == (stat.st_size, stat.st_mtime_ns) and len(pixels) == self.HEADER.size + w * h * 4:
+                surface = pygame.image.frombuffer(memoryview(pixels)[self.HEADER.size:], (w, h), "RGBA" if alpha else "RGBX")
+                self.hits += 1
+                return surface
+        except (OSError, ValueError, struct.error): # missing, empty or cut short.
+            pass
+        self.misses += 1
+        return self.store(entry, stat, pygame.image.load(path))
+
+    def store(self, entry, stat, surface): # returns the surface as a hit would load it.
+        if surface.get_colorkey() is not None: # to per-pixel alpha: the blit leaves key pixels at alpha 0.
+            keyed, surface = surface, pygame.Surface(surface.get_size(), pygame.SRCALPHA, 32)
+            surface.blit(keyed, (0, 0))
+        alpha = bool(surface.get_flags() & pygame.SRCALPHA)
+        header = self.HEADER.pack(self.MAGIC, *surface.get_size(), alpha, stat.st_size, stat.st_mtime_ns)
+        temporary = f"{entry}.{os.getpid()}.{threading.get_ident()}" # loads run on several threads.
+        try:
+            with open(temporary, "wb") as f:
+                f.write(header)
+                f.write(pygame.image.tostring(surface, "RGBA" if alpha else "RGBX"))
+            os.replace(temporary, entry)
+        except OSError as e: # full disk etc.: the image still loads, just not from the cache.
+            print(f"Could not cache {entry}: {e}.")
+        return surface
+
+    def report(self):
+        return f"Pixel cache: {self.hits} hits, {self.misses} misses."
+
+pixel_cache = None # a PixelCache to load images through, if wanted.
+
+def load_surface(path, scale=1):
+    surface = pixel_cache.load(path) if pixel_cache else pygame.image.load(path)
+    if scale != 1:
+        size = (max(1, round(surface.get_width() * scale)), max(1, round(surface.get_height() * scale)))
+        if surface.get_bitsize() >= 24: # smoothscale only handles 24/32-bit surfaces.
+            surface = pygame.transform.smoothscale(surface, size)
+        else:
+            surface = pygame.transform.scale(surface, size)
+    return surface
+
+# True if every pixel is fully opaque, so whatever is drawn under the image can't show.
+def opaque(surface):
+    if surface.get_flags() & pygame.SRCALPHA or surface.get_colorkey() is not None:
+        return pygame.mask.from_surface(surface, 254).count() == surface.get_width() * surface.get_height()
+    return True
+
+cache = TextureCache()
+
+# every Surface -> Texture upload goes through here so they can be counted.
+def upload(surface):
+    cache.uploads += 1
+    cache.upload_bytes += surface.get_width() * surface.get_height() * 4
+    return pygame._sdl2.Texture.from_surface(renderer, surface)
+
+def upload_into(texture, surface): # same, into an existing (streaming) texture.
+    cache.uploads += 1
+    cache.upload_bytes += surface.get_width() * surface.get_height() * 4
+    texture.update(surface)
+
+def load_texture(path, scale=1):
+    return cache.get(path, scale)
+
+def is_opaque(path): # for a path loaded with load_texture().
+    return cache.opaque.get(os.path.realpath(path), False)
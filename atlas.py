@@ -0,0 +1,79 @@
+import pygame
+import os
+import json
+import hashlib
+import asset_cache
+
+# Packs a directory of frames (an Animation, a SpriteSheet) into one or a few large textures, so
+# playback swaps a source rectangle instead of a texture. The packed pages and their frame index
+# are kept in .cache/atlas/ and only rebuilt when a frame file is added, removed or saved again.
+
+CACHE = os.path.dirname(os.path.realpath(__file__)) + "/.cache/atlas/"
+MAX_SIZE = 4096 # page edge in pixels; safe on practically every GPU.
+PADDING = 1 # transparent gap between frames, against bleeding when scaled.
+
+def source_key(files): # changes whenever a frame file does.
+    digest = hashlib.sha1()
+    for file in files:
+        stat = os.stat(file)
+        digest.update(f"{file}|{stat.st_size}|{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+# shelf packing: tallest frames first, left to right in rows, a new page when a page is full.
+# returns the page sizes and one (page, x, y, w, h) per frame in the original order.
+def pack(sizes):
+    area = sum((w + PADDING) * (h + PADDING) for w, h in sizes)
+    width = min(MAX_SIZE, max(max(w for w, h in sizes) + PADDING, 1 << int(area ** 0.5 * 1.1).bit_length()))
+    places = [None] * len(sizes)
+    pages = []
+    x = y = shelf = 0
+    for i in sorted(range(len(sizes)), key=lambda i: -sizes[i][1]):
+        w, h = sizes[i]
+        if x + w > width: # next shelf.
+            x, y, shelf = 0, y + shelf, 0
+        if y + h > MAX_SIZE and y > 0: # next page.
+            pages.append((width, y))
+            x = y = shelf = 0
+        places[i] = (len(pages), x, y, w, h)
+        x += w + PADDING
+        shelf = max(shelf, h + PADDING)
+    pages.append((width, y + shelf))
+    return pages, places
+
+def build(name, files, key):
+    surfaces = [asset_cache.load_surface(file) for file in files]
+    page_sizes, places = pack([surface.get_size() for surface in surfaces])
+    pages = [pygame.Surface(size, pygame.SRCALPHA) for size in page_sizes]
+    for surface, (page, x, y, w, h) in zip(surfaces, places):
+        pages[page].blit(surface, (x, y)) # onto transparent pixels pygame copies, alpha included.
+    index = {"key": key, "files": files, "frames": places, "pages": [f"{name}-{i}.png" for i in range(len(pages))]}
+    try:
+        os.makedirs(CACHE, exist_ok=True)
+        for page, filename in zip(pages, index["pages"]):
+            pygame.image.save(page, CACHE + filename)
+            asset_cache.cache.invalidate(CACHE + filename) # an older build may still be cached.
+        temporary = f"{CACHE}{name}.json.{os.getpid()}" # a show killed mid-write leaves the old index, not half a new one.
+        with open(temporary, "w") as f:
+            json.dump(index, f)
+        os.replace(temporary, CACHE + name + ".json")
+    except OSError as e: # read-only install: use the pages from memory this time.
+        print(f"Could not store atlas {name}: {e}.")
+        return index, [asset_cache.upload(page) for page in pages]
+    return index, None
+
+# [(Texture, Rect)] per file, in order. pages are shared through asset_cache like any image.
+def load(directory, files):
+    name = os.path.basename(os.path.normpath(directory)) + "-" + hashlib.sha1(os.path.realpath(directory).encode()).hexdigest()[:8]
+    key = source_key(files)
+    try:
+        with open(CACHE + name + ".json") as f:
+            index = json.load(f)
+        current = index["key"] == key and all(os.path.isfile(CACHE + page) for page in index["pages"])
+    except (OSError, ValueError, KeyError, TypeError): # missing or unreadable: built again.
+        current = False
+    textures = None
+    if not current:
+        index, textures = build(name, files, key)
+    if textures is None:
+        textures = [asset_cache.load_texture(CACHE + page) for page in index["pages"]]
+    return [(textures[page], pygame.Rect(x, y, w, h)) for page, x, y, w, h in index["frames"]]
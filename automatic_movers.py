@@ -1,6 +1,9 @@
 import math
+import motion
+from sub_effects import TICK
 
-# These classes are used to move individual effects list instances around automatically.
+# These classes set effects list instances moving automatically, by attaching paths to them on
+# motion.engine, which moves everything attached to it at once every frame (see motion.py).
 # 'R' resets effect positions as well as mover parameters.
 # Rememeber to include a reset() method in each class.
 
@@ -8,14 +11,11 @@ class Mover1: # sinusoidal vertical bob and weave.
     def __init__(self, anim):
         self.anim = anim
         self.ref_pos = anim.pos # need a starting position.
-        self.angle = 0
-        self.speed = 0.0002 # how many radians per frame
+        self.speed = 0.0002 # how many radians per tick (1/144 s)
         self.scale = 200 # amount moved at max
-
-    def move(self):
-        self.angle += self.speed
-        self.anim.pos = (self.ref_pos[0] + math.sin(math.pi*self.angle)*self.scale, self.ref_pos[1])
-        self.anim.theta = round(15*math.sin(20*self.angle))
+        # x follows sin(pi*angle) and the tilt 15*sin(20*angle), angle growing by speed every tick.
+        motion.engine.add(anim, motion.sinusoid((self.scale, 0), 2 * TICK / self.speed), origin=self.ref_pos)
+        motion.engine.add(anim, motion.sinusoid((15, 0), math.pi * TICK / (10 * self.speed)), attribute="theta")
 
     def reset(self):
-        self.angle = 0
\ No newline at end of file
+        motion.engine.reset(self.anim)
\ No newline at end of file
@@ -0,0 +1,220 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+# no window: everything renders to an offscreen target, like offline_render.py.
+os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame._sdl2
+import numpy
+import subtitler
+import sub_effects
+import asset_cache
+import motion
+
+try:
+    import resource # peak memory; unix only.
+except ImportError:
+    resource = None
+
+# Synthetic workloads built from the real classes, timed frame by frame without a window.
+#
+#   python benchmark.py                   run everything, compare against benchmark_baseline.json
+#   python benchmark.py --save            run everything and store the results as the new baseline
+#   python benchmark.py grid-1000 stars-40000 --frames 600
+#
+# Each workload runs in its own process so peak memory is its own. A workload regresses if its
+# p95 frame time or peak memory grows by more than --tolerance, or it uploads more textures than
+# the baseline did; the exit status is then 1.
+
+RESOLUTION = (1920, 1080)
+DT = 1 / 144
+
+def setup():
+    pygame.init()
+    settings = subtitler.Settings("clustered", RESOLUTION)
+    settings.current_index = 0
+    settings.directory_list = [settings.image_set]
+    screen = pygame._sdl2.Window("benchmark", size=RESOLUTION, hidden=True)
+    renderer = pygame._sdl2.Renderer(screen)
+    subtitler.settings, subtitler.screen, subtitler.renderer = settings, screen, renderer
+    sub_effects.settings, sub_effects.screen, sub_effects.renderer = settings, screen, renderer
+    asset_cache.renderer = renderer
+    return settings, screen, renderer
+
+def on(effect): # toggle an effect on and let it fade in fully.
+    effect.toggle()
+    for i in range(200):
+        effect.update(DT)
+    return effect
+
+# workloads: each takes its size and returns step(), which draws one frame into the current target.
+
+def grid(tiles):
+    side = int((RESOLUTION[0] * RESOLUTION[1] / tiles) ** 0.5) # square tiles covering the screen.
+    settings = subtitler.settings
+    settings.img_width = settings.img_height = side
+    settings.x, settings.y = -(-RESOLUTION[0] // side), -(-RESOLUTION[1] // side)
+    settings.images = [str(i) for i in range(16)]
+    colours = numpy.random.default_rng(0).integers(0, 256, (16, 3))
+    surfaces = [pygame.Surface((side, side)) for colour in colours]
+    for surface, colour in zip(surfaces, colours):
+        surface.fill(colour.tolist())
+    subtitler.DisplayFrame.TEXTURES = [asset_cache.upload(surface) for surface in surfaces]
+    tile_grid = subtitler.TileGrid(settings)
+    def step():
+        tile_grid.update(DT)
+        tile_grid.draw()
+    return step
+
+def animations(count):
+    anims = [on(sub_effects.Animation("frontfist", frametime=30, pos=(100 + i * 37 % 1700, 100 + i * 53 % 900))) for i in range(count)]
+    def step():
+        for anim in anims:
+            anim.TEXTURE.draw(**anim.update(DT))
+    return step
+
+def stars(count):
+    sky = on(sub_effects.Stars(count, 1, 4))
+    def step():
+        sky.draw(DT)
+    return step
+
+def particles(count): # a steady state of about count particles.
+    emitter = sub_effects.Emitter("hand_point_bits.png", pos=(960, 900), rate=count / 225, max_particles=count * 2, burst=count)
+    on(emitter)
+    def step():
+        emitter.draw(DT)
+    return step
+
+def movers(count): # animations circling on motion paths, all moved by one engine step.
+    anims = [on(sub_effects.Animation("frontfist", frametime=30, scale=0.2)) for i in range(count)]
+    path = motion.arc((400, 300), period=5)
+    for i, anim in enumerate(anims):
+        motion.engine.add(anim, path, origin=(960, 540), phase=i / count)
+    def step():
+        motion.engine.step(DT)
+        for anim in anims:
+            anim.TEXTURE.draw(**anim.update(DT))
+    return step
+
+def spotlight(_):
+    light = sub_effects.Spotlight(sorted(os.listdir(subtitler.settings.path + "spotlights/"))[0], RESOLUTION)
+    light.toggle()
+    light.opacity = 255
+    def step():
+        light.draw(DT)
+    return step
+
+def text(lines): # a new line every frame, from a generated dialogue file.
+    settings = subtitler.settings
+    settings.path = tempfile.mkdtemp() + "/"
+    os.makedirs(settings.path + "pics")
+    with open(settings.path + "pics/" + settings.image_set + ".txt", "w") as f:
+        f.writelines(f"SPEAKER {i}#Line number {i} of the benchmark dialogue, long enough to need fitting.\n" for i in range(lines))
+    subtitles = subtitler.Text()
+    def step():
+        subtitles.next_message()
+        subtitles.pump()
+        for box in subtitles.boxes:
+            subtitler.Text.BOX.draw(dstrect=box)
+        for texture, rect in subtitles.texts.items():
+            texture.draw(dstrect=rect.topleft)
+    return step
+
+WORKLOADS = {
+    "grid-100": (grid, 100), "grid-1000": (grid, 1000), "grid-10000": (grid, 10000),
+    "animations-10": (animations, 10), "animations-100": (animations, 100),
+    "movers-10": (movers, 10), "movers-500": (movers, 500),
+    "stars-400": (stars, 400), "stars-4000": (stars, 4000), "stars-40000": (stars, 40000), "stars-100000": (stars, 100000),
+    "particles-1000": (particles, 1000), "particles-5000": (particles, 5000),
+    "spotlight": (spotlight, None),
+    "text": (text, 200),
+}
+
+def run_workload(name, frames, warmup=30):
+    settings, screen, renderer = setup()
+    buffer = pygame._sdl2.Texture(renderer, RESOLUTION, target=True)
+    builder, size = WORKLOADS[name]
+    start = time.perf_counter()
+    step = builder(size)
+    setup_time = time.perf_counter() - start
+    uploads, upload_bytes = asset_cache.cache.uploads, asset_cache.cache.upload_bytes
+    times = []
+    for frame in range(warmup + frames):
+        start = time.perf_counter()
+        renderer.target = buffer
+        renderer.clear()
+        step()
+        renderer.target = None
+        buffer.draw()
+        renderer.present()
+        if frame >= warmup:
+            times.append(time.perf_counter() - start)
+    times = numpy.array(times) * 1000
+    p50, p95, p99 = numpy.percentile(times, (50, 95, 99))
+    return {"p50": p50, "p95": p95, "p99": p99, "max": times.max(), "mean": times.mean(),
+            "setup_ms": setup_time * 1000,
+            "uploads": asset_cache.cache.uploads, "frame_uploads": asset_cache.cache.uploads - uploads,
+            "upload_mb": asset_cache.cache.upload_bytes / 2**20, "frame_upload_mb": (asset_cache.cache.upload_bytes - upload_bytes) / 2**20,
+            "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None}
+
+def run_in_process(name, frames): # the last line of output is the JSON result.
+    out = subprocess.run([sys.executable, os.path.realpath(__file__), "--child", name, "--frames", str(frames)],
+                         capture_output=True, text=True)
+    if out.returncode != 0:
+        raise RuntimeError(f"{name} failed:\n{out.stderr}")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def regressions(name, result, baseline, tolerance):
+    found = []
+    for key in ("p95", "peak_mb"):
+        if result.get(key) is not None and baseline.get(key) and result[key] > baseline[key] * (1 + tolerance) and result[key] - baseline[key] > 0.05:
+            found.append(f"{name}: {key} {baseline[key]:.2f} -> {result[key]:.2f}")
+    if result["uploads"] > baseline.get("uploads", result["uploads"]):
+        found.append(f"{name}: uploads {baseline['uploads']} -> {result['uploads']}")
+    return found
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Headless render benchmarks with a stored baseline.")
+    parser.add_argument("workloads", nargs="*", help="default: all of " + ", ".join(WORKLOADS))
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--baseline", default=os.path.dirname(os.path.realpath(__file__)) + "/benchmark_baseline.json")
+    parser.add_argument("--save", action="store_true", help="store these results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative growth, 0.2 = 20%%")
+    parser.add_argument("--child", help=argparse.SUPPRESS) # run one workload in this process.
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_workload(args.child, args.frames)))
+        os._exit(0) # skip SDL teardown, the result is out.
+
+    baseline = {}
+    if os.path.isfile(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results, failed = {}, []
+    print("{:16}{:>9}{:>9}{:>9}{:>9}{:>10}{:>9}{:>10}".format("workload", "p50 ms", "p95 ms", "p99 ms", "max ms", "setup ms", "uploads", "peak MB"))
+    for name in args.workloads or WORKLOADS:
+        r = results[name] = run_in_process(name, args.frames)
+        peak = f"{r['peak_mb']:10.0f}" if r["peak_mb"] is not None else "{:>10}".format("-")
+        print(f"{name:16}{r['p50']:9.2f}{r['p95']:9.2f}{r['p99']:9.2f}{r['max']:9.2f}{r['setup_ms']:10.0f}{r['uploads']:9}" + peak)
+        if name in baseline and not args.save:
+            failed += regressions(name, r, baseline[name], args.tolerance)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2)
+        print(f"Saved baseline to {args.baseline}.")
+    elif not baseline:
+        print("No baseline to compare against, run with --save first.")
+    for line in failed:
+        print("REGRESSION " + line)
+    sys.exit(1 if failed else 0)
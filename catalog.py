@@ -0,0 +1,87 @@
+import os
+import time
+import queue
+import threading
+
+# folders under the program directory that hold assets.
+FOLDERS = ("pics", "overlays", "spotlights", "effects", "animations")
+
+class AssetCatalog:
+
+    '''
+    Every asset file under FOLDERS with its size and mtime, indexed once at startup. list() answers
+    from the index instead of the disk. After start(), a watcher thread polls the folders every
+    `interval` seconds and queues what was added, modified or removed; a file counts as changed only
+    once it has kept the same size and mtime for a whole interval, so a file still being saved isn't
+    reported half written. changes() hands the queue to the render thread, which reloads just those.
+    '''
+
+    def __init__(self, root, folders=FOLDERS, interval=1.0):
+        self.root = root
+        self.folders = folders
+        self.interval = interval
+        self.files, self.children = self.scan()
+        self.settling = {} # path: stat seen changed on the last poll, reported if it holds.
+        self.queue = queue.Queue() # (kind, path relative to root), kind is added/modified/removed.
+        self.lock = threading.Lock() # forget() and poll() both replace files.
+
+    def scan(self): # files: {path: (size, mtime)}, children: {folder: {name}}. paths use /.
+        files, children = {}, {}
+        for folder in self.folders:
+            for dirpath, dirnames, filenames in os.walk(self.root + folder):
+                dirnames[:] = [name for name in dirnames if not name.startswith(".")]
+                rel = os.path.relpath(dirpath, self.root).replace(os.sep, "/")
+                children[rel] = set(dirnames)
+                for name in filenames:
+                    if name.startswith(".") or name.endswith("~"): # editor temp files.
+                        continue
+                    try:
+                        stat = os.stat(os.path.join(dirpath, name))
+                    except OSError: # deleted while scanning.
+                        continue
+                    files[rel + "/" + name] = (stat.st_size, stat.st_mtime_ns)
+                    children[rel].add(name)
+        return files, children
+
+    def list(self, folder): # names in folder (e.g. "overlays", "pics/eyes"), sorted. never touches the disk.
+        return sorted(self.children.get(folder.strip("/"), ()))
+
+    def start(self):
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    def watch(self):
+        while True:
+            time.sleep(self.interval)
+            self.poll()
+
+    def poll(self):
+        files, children = self.scan()
+        with self.lock:
+            self.update(files)
+        self.children = children
+
+    def update(self, files):
+        for path, stat in files.items():
+            if self.files.get(path) == stat:
+                self.settling.pop(path, None)
+            elif self.settling.get(path) == stat: # stable for an interval: done writing.
+                self.queue.put(("added" if path not in self.files else "modified", path))
+                del self.settling[path]
+            else:
+                self.settling[path] = stat
+        for path in self.files.keys() - files.keys():
+            self.queue.put(("removed", path))
+            self.settling.pop(path, None)
+        # files still settling keep their old entry, so the next poll sees them again.
+        self.files = {path: self.files[path] if path in self.settling else stat
+                      for path, stat in files.items() if path not in self.settling or path in self.files}
+
+    def changes(self): # everything queued since the last call. render thread, once per frame.
+        found = []
+        while not self.queue.empty():
+            found.append(self.queue.get())
+        return found
+
+    def forget(self, path): # report path again on the next poll, e.g. when it failed to load.
+        with self.lock:
+            self.files = {key: stat for key, stat in self.files.items() if key != path}
@@ -0,0 +1,98 @@
+import time
+import queue
+import asyncio
+import threading
+import cues
+
+# A local control endpoint, so a second operator or a lighting controller can fire the same actions
+# as the keyboard from another process. One command per line over TCP on localhost:
+#     effect 3
+#     line
+#     next_scene
+# The names are the cue actions in cues.py ("help" lists them). Every command is answered with
+# "ok <ms>" once the frame that applied it is on screen, <ms> being the time from receiving the
+# command to that frame, or with "error <reason>". For example: printf 'line\n' | nc localhost 7700
+
+class ControlServer:
+
+    '''
+    Runs an asyncio server on a background thread. Commands become the key and mouse events of
+    cues.make_event and wait in a queue; the render loop takes them with due() once per frame, posts
+    them before handling input, and calls presented() after the frame is shown, which answers the
+    clients and records the latency.
+    '''
+
+    def __init__(self, port=7700, host="127.0.0.1"):
+        self.port = port
+        self.host = host
+        self.loop = None
+        self.commands = queue.Queue() # (event, time received, future to answer).
+        self.applying = [] # taken by due() this frame, answered by presented().
+        self.latencies = [] # seconds, command to presented frame.
+
+    def start(self):
+        ready = threading.Event()
+        threading.Thread(target=lambda: asyncio.run(self.serve(ready)), daemon=True).start()
+        ready.wait()
+
+    async def serve(self, ready):
+        self.loop = asyncio.get_running_loop()
+        try:
+            server = await asyncio.start_server(self.handle, self.host, self.port)
+        except OSError as e:
+            print(f"Control server failed: {e}.")
+            ready.set()
+            return
+        print(f"Control server on {self.host}:{self.port}.")
+        ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        try:
+            while line := await reader.readline():
+                words = line.decode(errors="replace").split()
+                if not words:
+                    continue
+                if words[0] == "help":
+                    writer.write(("ok " + " ".join(cues.ACTIONS) + "\n").encode())
+                else:
+                    try:
+                        event = cues.make_event(words[0], words[1] if len(words) > 1 else None)
+                    except ValueError as e:
+                        writer.write(f"error {e}\n".encode())
+                    else:
+                        done = self.loop.create_future()
+                        self.commands.put((event, time.perf_counter(), done))
+                        writer.write(f"ok {await done * 1000:.1f} ms\n".encode())
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def due(self): # render thread: events to post this frame.
+        events = []
+        while not self.commands.empty():
+            command = self.commands.get()
+            self.applying.append(command)
+            events.append(command[0])
+        return events
+
+    def presented(self): # render thread: the frame with the events from due() is on screen.
+        now = time.perf_counter()
+        for event, received, done in self.applying:
+            self.latencies.append(now - received)
+            self.loop.call_soon_threadsafe(self.answer, done, now - received)
+        self.applying = []
+
+    def answer(self, done, latency): # on the server thread. the client may have gone meanwhile.
+        if not done.done():
+            done.set_result(latency)
+
+    def report(self):
+        if not self.latencies:
+            return "Control server: no commands."
+        latencies = sorted(self.latencies)
+        return (f"Control server: {len(latencies)} commands, command to frame "
+                f"{latencies[len(latencies) // 2] * 1000:.1f} ms median, {latencies[-1] * 1000:.1f} ms max.")
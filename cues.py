@@ -0,0 +1,110 @@
+import pygame
+import os
+import csv
+import json
+from bisect import bisect_left, bisect_right
+
+# A cue file drives a show without the keyboard. Each cue is a time and an action, fired as the
+# same key or mouse event an operator would produce, so it does exactly what the key does.
+#
+# CSV, one cue per row (lines starting with # are comments, a header row is optional):
+#     time,action,argument
+#     0:05,effect,1
+#     0:12.5,line
+#     1:02:00,next_scene
+# JSON: [{"time": "0:05", "action": "effect", "argument": 1}, ...]
+#
+# time is seconds, m:ss or h:mm:ss (fractions allowed), counted from the start of main().
+
+ACTIONS = { # action: (event type, key or mouse button)
+    "line": (pygame.KEYDOWN, pygame.K_z), # show next line / hide current one.
+    "first_line": (pygame.KEYDOWN, pygame.K_RETURN),
+    "reload_text": (pygame.KEYDOWN, pygame.K_t),
+    "reset": (pygame.KEYDOWN, pygame.K_r),
+    "directory": (pygame.KEYDOWN, pygame.K_d),
+    "overlay": (pygame.KEYDOWN, pygame.K_b),
+    "next_overlay": (pygame.KEYDOWN, pygame.K_UP),
+    "previous_overlay": (pygame.KEYDOWN, pygame.K_DOWN),
+    "next_scene": (pygame.KEYDOWN, pygame.K_RIGHT),
+    "previous_scene": (pygame.KEYDOWN, pygame.K_LEFT),
+    "next_control": (pygame.KEYDOWN, pygame.K_PAGEUP),
+    "previous_control": (pygame.KEYDOWN, pygame.K_PAGEDOWN),
+    "effect": (pygame.KEYDOWN, pygame.K_1), # argument 1-9.
+    "spotlight": (pygame.MOUSEBUTTONDOWN, 3),
+    "next_spotlight": (pygame.MOUSEBUTTONDOWN, 4),
+    "previous_spotlight": (pygame.MOUSEBUTTONDOWN, 5),
+    "quit": (pygame.KEYDOWN, pygame.K_ESCAPE),
+}
+
+def parse_time(value):
+    seconds = 0
+    for part in str(value).strip().split(":"):
+        seconds = seconds * 60 + float(part)
+    if seconds < 0:
+        raise ValueError("negative time")
+    return seconds
+
+def make_event(action, argument):
+    if action not in ACTIONS:
+        raise ValueError(f"unknown action '{action}'")
+    kind, code = ACTIONS[action]
+    if action == "effect":
+        if argument is None or not str(argument).isnumeric() or not 1 <= int(argument) <= 9:
+            raise ValueError("effect needs a number 1-9")
+        code += int(argument) - 1
+    if kind == pygame.KEYDOWN:
+        return pygame.event.Event(kind, key=code, mod=0, unicode="", scancode=0)
+    return pygame.event.Event(kind, button=code, pos=(0,0))
+
+class CueTimeline:
+
+    '''
+    Cues parsed and validated once, kept sorted by time. due() hands out the events whose time has
+    come since the last call; seek() moves the playhead anywhere with a binary search. The cues
+    before a seek are replayed all at once by the next due(), so the show catches up with the state
+    it would be in: main() then skips the fades they started and loads only the directory and
+    scenes they end on (see catching_up).
+    '''
+
+    def __init__(self, cues): # cues: [(seconds, Event)]
+        cues = sorted(cues, key=lambda cue: cue[0]) # stable: same-time cues keep file order.
+        self.times = [cue[0] for cue in cues]
+        self.events = [cue[1] for cue in cues]
+        self.next = 0 # index of the first cue not fired yet.
+        self.offset = 0 # show time minus the time main() has been running, set by seek().
+        self.skipped = [] # events before the seek point, for the next due().
+
+    @classmethod
+    def load(self, path):
+        with open(path, newline="") as f:
+            if os.path.splitext(path)[1].lower() == ".json":
+                rows = [(i + 1, (row.get("time"), row.get("action"), row.get("argument"))) for i, row in enumerate(json.load(f))]
+            else:
+                rows = [(i + 1, row) for i, row in enumerate(csv.reader(f)) if row and not row[0].strip().startswith("#")]
+                rows = [(number, row) for number, row in rows if row[0].strip() != "time"] # header.
+        cues = []
+        for number, row in rows:
+            try:
+                if len(row) < 2:
+                    raise ValueError("expected time,action[,argument]")
+                argument = row[2] if len(row) > 2 and str(row[2]).strip() != "" else None
+                cues.append((parse_time(row[0]), make_event(str(row[1]).strip(), argument)))
+            except (ValueError, TypeError) as e:
+                raise ValueError(f"{path}, cue {number}: {e}.")
+        print(f"Loaded {len(cues)} cues from {path}.")
+        return CueTimeline(cues)
+
+    def due(self, elapsed): # events up to the current show time that haven't fired yet.
+        stop = bisect_right(self.times, elapsed + self.offset, lo=self.next)
+        events = self.skipped + self.events[self.next:stop]
+        self.skipped = []
+        self.next = stop
+        return events
+
+    def catching_up(self): # the next due() replays the cues before a seek.
+        return bool(self.skipped)
+
+    def seek(self, seconds, elapsed=0): # jump the show to seconds, as if every cue before it had fired.
+        self.next = bisect_left(self.times, seconds)
+        self.skipped = self.events[:self.next]
+        self.offset = seconds - elapsed
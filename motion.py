@@ -0,0 +1,120 @@
+import weakref
+import numpy
+
+# Declarative motion for effects. A Path is one cycle of movement sampled into a lookup table
+# (x, y offsets, or angles in degrees in x), built once by linear(), bezier(), sinusoid() or arc().
+# engine.add(target, path) attaches it to anything with a pos (or, with attribute="theta", a theta):
+#
+#   motion.engine.add(sprite, motion.arc((300, 200), period=5), origin=(960, 540))
+#   motion.engine.add(sprite, motion.sinusoid((15, 0), period=0.5), attribute="theta")
+#
+# The render loop calls engine.step(dt) once per frame, which moves every attached target at once.
+
+SAMPLES = 1024 # per cycle of the periodic paths. linear interpolation in between.
+
+class Path:
+
+    def __init__(self, samples, duration, loop=True):
+        self.samples = numpy.asarray(samples, dtype=float).reshape(-1, 2)
+        self.duration = duration # seconds per cycle.
+        self.loop = loop # or stop at the last sample.
+
+def linear(keyframes, loop=False, samples=SAMPLES): # keyframes: [(seconds, (x, y)), ...], straight lines between.
+    times = numpy.array([time for time, point in keyframes], dtype=float)
+    points = numpy.array([point for time, point in keyframes], dtype=float)
+    duration = times[-1]
+    at = numpy.linspace(0, duration, samples, endpoint=not loop)
+    return Path(numpy.column_stack([numpy.interp(at, times, points[:, 0]), numpy.interp(at, times, points[:, 1])]), duration, loop)
+
+def bezier(points, duration, loop=False, samples=SAMPLES): # cubic segments: start, control, control, end, control, control, end...
+    points = numpy.array(points, dtype=float)
+    segments = (len(points) - 1) // 3
+    if segments < 1 or len(points) != segments * 3 + 1:
+        raise ValueError(f"bezier needs 3n+1 points, got {len(points)}")
+    u = numpy.linspace(0, segments, samples, endpoint=not loop)
+    index = numpy.minimum(u.astype(int), segments - 1) # each segment takes the same time.
+    t = (u - index)[:, None]
+    p0, p1, p2, p3 = (points[index * 3 + k] for k in range(4))
+    return Path((1-t)**3 * p0 + 3 * (1-t)**2 * t * p1 + 3 * (1-t) * t**2 * p2 + t**3 * p3, duration, loop)
+
+def sinusoid(amplitude, period, samples=SAMPLES): # amplitude * sin, per axis. (15, 0) with attribute="theta" rocks by 15 degrees.
+    wave = numpy.sin(numpy.linspace(0, 2*numpy.pi, samples, endpoint=False))
+    return Path(wave[:, None] * numpy.array(amplitude, dtype=float), period)
+
+def arc(axes, period, samples=SAMPLES): # an ellipse with radii axes, counting angles from +x towards +y.
+    angle = numpy.linspace(0, 2*numpy.pi, samples, endpoint=False)
+    return Path(numpy.column_stack([axes[0] * numpy.cos(angle), axes[1] * numpy.sin(angle)]), period)
+
+class MotionEngine:
+
+    '''
+    Holds the sample tables of every Path in use (once per Path, however many targets share it) and
+    one row per attached track: where its table starts, its length, phase in cycles, rate, origin.
+    step() advances all phases and looks up and interpolates all tables in one numpy pass, then
+    writes pos (and rect.center) or theta back to each target. Targets are held weakly, so an
+    effect that is thrown away leaves the engine by itself. reset() returns tracks to their start.
+    '''
+
+    def __init__(self):
+        self.tables = numpy.zeros((0, 2))
+        self.offsets = {} # Path: where its samples start in tables.
+        self.targets = [] # weak references.
+        self.attributes = [] # "pos" or "theta".
+        self.rows = numpy.zeros((0, 6)) # table start, table length, loop, cycles per second, starting phase, phase.
+        self.origins = numpy.zeros((0, 2))
+
+    def add(self, target, path, attribute="pos", origin=None, phase=0):
+        if path not in self.offsets:
+            self.offsets[path] = len(self.tables)
+            self.tables = numpy.concatenate([self.tables, path.samples])
+        if origin is None: # around where the target is now. angles are absolute.
+            origin = target.pos if attribute == "pos" else (0, 0)
+        row = (self.offsets[path], len(path.samples), path.loop, 1 / path.duration, phase, phase)
+        self.rows = numpy.vstack([self.rows, row])
+        self.origins = numpy.vstack([self.origins, origin])
+        self.targets.append(weakref.ref(target))
+        self.attributes.append(attribute)
+
+    def remove(self, target):
+        self.keep([ref() is not target for ref in self.targets])
+
+    def keep(self, mask):
+        self.rows = self.rows[mask]
+        self.origins = self.origins[mask]
+        self.targets = [ref for ref, kept in zip(self.targets, mask) if kept]
+        self.attributes = [attribute for attribute, kept in zip(self.attributes, mask) if kept]
+
+    def step(self, dt):
+        if not self.targets:
+            return
+        start, length, loop, rate, _, phase = self.rows.T
+        loop = loop > 0
+        phase += rate * dt # a view: updates self.rows.
+        phase[loop] %= 1
+        numpy.clip(phase, 0, 1, out=phase)
+        # looping tables wrap from the last sample back to the first, the others end on the last one.
+        u = phase * numpy.where(loop, length, length - 1)
+        index = numpy.minimum(u.astype(int), length - 1)
+        after = numpy.where(loop, (index + 1) % length, numpy.minimum(index + 1, length - 1))
+        fraction = (u - index)[:, None]
+        values = self.tables[(start + index).astype(int)] * (1 - fraction) + self.tables[(start + after).astype(int)] * fraction
+        values += self.origins
+        alive = True
+        for ref, attribute, (x, y) in zip(self.targets, self.attributes, values.tolist()):
+            target = ref()
+            if target is None:
+                alive = False
+            elif attribute == "pos":
+                target.pos = (x, y)
+                if hasattr(target, "rect"):
+                    target.rect.center = target.pos
+            else:
+                target.theta = x
+        if not alive:
+            self.keep([ref() is not None for ref in self.targets])
+
+    def reset(self, target=None): # back to the starting phase: every track, or just target's.
+        mask = [target is None or ref() is target for ref in self.targets]
+        self.rows[mask, 5] = self.rows[mask, 4]
+
+engine = MotionEngine() # stepped by subtitler.main(), shared by everything that moves on its own.
@@ -0,0 +1,100 @@
+import os
+import time
+import argparse
+
+# SDL picks its video driver when pygame initialises, so this has to happen first: no display needed.
+os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame._sdl2
+import subtitler
+import cues
+import asset_cache
+
+# Renders a show without a window or frame pacing and writes every frame of the buffer to disk,
+# as fast as the machine allows. Uses the same main loop as the live program: tiles, overlays,
+# effects, scenes, spotlight and text.
+#
+#   python offline_render.py clustered --resolution 1080 --frames 1440 --keys 1 b z
+#
+# png writes a numbered image sequence into --output. raw writes back-to-back RGBA frames into
+# --output/frames.rgba, e.g. for: ffmpeg -f rawvideo -pix_fmt rgba -s 1920x1080 -r 144 -i frames.rgba out.mp4
+
+class FrameWriter:
+
+    def __init__(self, output, fmt="png"):
+        os.makedirs(output, exist_ok=True)
+        self.output = output
+        self.format = fmt
+        self.stream = open(os.path.join(output, "frames.rgba"), "wb") if fmt == "raw" else None
+        self.frames = 0
+        self.start = self.last_report = time.perf_counter()
+
+    def write(self, surface):
+        if self.stream:
+            self.stream.write(pygame.image.tostring(surface, "RGBA"))
+        else:
+            pygame.image.save(surface, os.path.join(self.output, f"{self.frames:06d}.png"))
+        self.frames += 1
+        now = time.perf_counter()
+        if now - self.last_report >= 1: # progress once a second.
+            self.last_report = now
+            print(self.report())
+
+    def close(self):
+        if self.stream:
+            self.stream.close()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        return f"{self.frames} frames in {elapsed:.1f} s ({self.frames / elapsed:.1f} fps)."
+
+def press_keys(names): # posted before the first frame, handled like keyboard input.
+    for name in names:
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.key.key_code(name), mod=0, unicode="", scancode=0))
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description="Render a show to image files without a display.")
+    parser.add_argument("directory", help="image directory in ./pics, by name or number")
+    parser.add_argument("--resolution", type=int, default=1080, help="height in pixels, always 16:9")
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--fps", type=int, default=144, help="frame rate the show is timed for")
+    parser.add_argument("--output", default="renders")
+    parser.add_argument("--format", choices=("png", "raw"), default="png")
+    parser.add_argument("--keys", nargs="*", default=[], help="keys pressed on the first frame, e.g. 1 b z right")
+    parser.add_argument("--cues", help="cue file (.csv or .json) to drive the show, see cues.py")
+    parser.add_argument("--seek", type=cues.parse_time, default=0, help="start the cue file here, e.g. 1:02:00")
+    parser.add_argument("--profile-csv", help="write per-frame phase timings here, see profiler.py")
+    parser.add_argument("--pixel-cache", action="store_true", help="keep decoded images in .cache/pixels for faster loads")
+    args = parser.parse_args()
+    if args.pixel_cache:
+        asset_cache.pixel_cache = asset_cache.PixelCache()
+
+    hub_path = os.path.dirname(os.path.realpath(__file__)) + "/pics/"
+    directories = subtitler.find_image_directories(hub_path)
+    index = int(args.directory) - 1 if args.directory.isnumeric() else directories.index(args.directory)
+    resolution = (args.resolution*16//9, args.resolution)
+
+    settings = subtitler.Settings(directories[index], resolution)
+    settings.current_index = index
+    settings.directory_list = directories
+    settings.fps = args.fps
+    settings.refresh_rng_value()
+    settings.profile_csv = args.profile_csv
+    screen = pygame._sdl2.Window("...", size=resolution, hidden=True)
+    renderer = pygame._sdl2.Renderer(screen)
+    pygame.init()
+    subtitler.settings, subtitler.screen, subtitler.renderer = settings, screen, renderer
+
+    timeline = cues.CueTimeline.load(args.cues) if args.cues else None
+    if timeline:
+        timeline.seek(args.seek)
+
+    writer = FrameWriter(args.output, args.format)
+    press_keys(args.keys)
+    try:
+        subtitler.main(settings, screen, renderer, sink=writer.write, frames=args.frames, timeline=timeline)
+    finally: # also on a quit cue, which exits from inside main().
+        writer.close()
+        print("Rendered " + writer.report())
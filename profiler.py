@@ -0,0 +1,83 @@
+import pygame._sdl2
+import time
+import numpy
+
+# set this from the main file in subtitler.main(), same as sub_effects.
+renderer = None
+
+# the parts of a frame in subtitler.main(), in the order they run.
+PHASES = ("movers", "tiles", "overlay", "effects", "scenes", "spotlight", "text", "events", "controls", "uploads", "record", "present", "pacing")
+
+class FrameProfiler:
+
+    '''
+    Times each phase of the main loop. mark(phase) charges the time since the previous mark to
+    phase, end_frame() stores the frame in a ring of the last `window` frames for the p50/p95/p99
+    shown by the HUD (F3), and writes it to csv_path if given. While neither is on, mark() returns
+    straight away, so it can stay in the loop.
+    '''
+
+    def __init__(self, csv_path=None, window=1000):
+        self.index = {phase: i for i, phase in enumerate(PHASES)}
+        self.samples = numpy.zeros((window, len(PHASES))) # seconds, one row per frame.
+        self.current = [0.0] * len(PHASES)
+        self.frames = 0
+        self.last = time.perf_counter()
+        self.hud = False
+        self.hud_texture = None
+        self.hud_refresh = 0 # time of the next HUD redraw.
+        self.csv = open(csv_path, "w") if csv_path else None
+        if self.csv:
+            self.csv.write("frame,total," + ",".join(PHASES) + "\n")
+        self.enabled = bool(self.csv)
+
+    def toggle_hud(self):
+        self.hud ^= True
+        self.enabled = self.hud or bool(self.csv)
+        self.last = time.perf_counter()
+        print(f"Profiler HUD is {self.hud}")
+
+    def mark(self, phase):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.current[self.index[phase]] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        self.samples[self.frames % len(self.samples)] = self.current
+        if self.csv:
+            self.csv.write(f"{self.frames},{sum(self.current) * 1000:.3f}," + ",".join(f"{t * 1000:.3f}" for t in self.current) + "\n")
+        self.current = [0.0] * len(PHASES)
+        self.frames += 1
+
+    def percentiles(self): # {phase: (p50, p95, p99)} in ms over the stored frames, "frame" for the total.
+        samples = self.samples[:min(self.frames, len(self.samples))]
+        if not len(samples):
+            return {}
+        samples = numpy.column_stack((samples.sum(axis=1), samples)) * 1000
+        table = numpy.percentile(samples, (50, 95, 99), axis=0).T
+        return dict(zip(("frame",) + PHASES, map(tuple, table)))
+
+    def draw(self): # HUD in the top left corner of the window, redrawn twice a second.
+        if not self.hud:
+            return
+        if time.perf_counter() >= self.hud_refresh:
+            self.hud_refresh = time.perf_counter() + 0.5
+            font = pygame.font.SysFont("courier", 16)
+            lines = ["{:10}{:>8}{:>8}{:>8}".format("ms", "p50", "p95", "p99")]
+            lines += ["{:10}{:8.2f}{:8.2f}{:8.2f}".format(phase, *p) for phase, p in self.percentiles().items()]
+            surfaces = [font.render(line, True, (255,255,255)) for line in lines]
+            hud = pygame.Surface((max(s.get_width() for s in surfaces) + 10, sum(s.get_height() for s in surfaces) + 10))
+            for i, surface in enumerate(surfaces):
+                hud.blit(surface, (5, 5 + i * surface.get_height()))
+            self.hud_texture = pygame._sdl2.Texture.from_surface(renderer, hud)
+            self.hud_texture.blend_mode = 1
+            self.hud_texture.alpha = 200
+        self.hud_texture.draw(dstrect=(0,0))
+
+    def close(self):
+        if self.csv:
+            self.csv.close()
@@ -0,0 +1,110 @@
+import os
+import time
+import queue
+import threading
+import pygame
+
+# Records what the audience sees during a live run, without holding up the frame. Same output as
+# offline_render.py: png writes a numbered image sequence into the output directory, raw writes
+# back-to-back RGBA frames into output/frames.rgba (for ffmpeg -f rawvideo -pix_fmt rgba ...). A raw
+# stream holds one frame size, so after a window resize raw frames go on in frames-<W>x<H>-<n>.rgba.
+
+class Recorder:
+
+    '''
+    capture() reads the buffer back into one of `pool` preallocated Surfaces and hands it to writer
+    threads through a bounded queue; the writers encode or dump it and give the Surface back. The
+    render thread never waits: with no free Surface the frame is dropped, and once readbacks have
+    used more than `share` of the frame time the next frames are skipped until it is paid back.
+    Records every `every`-th frame. report() counts what was recorded, dropped and skipped.
+    '''
+
+    def __init__(self, output, fmt="raw", every=1, share=0.1, pool=8, writers=2):
+        os.makedirs(output, exist_ok=True)
+        self.output = output
+        self.format = fmt
+        self.every = every
+        self.share = share
+        self.pool_size = pool
+        self.size = None # of the Surfaces in the pool, reallocated when the window is resized.
+        self.free = queue.Queue()
+        self.frames = queue.Queue(maxsize=pool) # (number, Surface, its pool, raw stream) waiting for a writer.
+        self.streams = [] # raw files, one per frame size, in order. the last one is written to.
+        self.stream = open(os.path.join(output, "frames.rgba"), "wb") if fmt == "raw" else None
+        if self.stream:
+            self.streams.append(self.stream)
+        self.count = 0 # frames seen by capture().
+        self.recorded = 0
+        self.dropped = 0 # writers behind, no free Surface.
+        self.skipped = 0 # over the render thread budget.
+        self.deepest = 0 # largest queue depth seen.
+        self.readback = 0 # seconds spent reading back, in total.
+        self.allowance = 0 # seconds of render thread time the recorder may still use.
+        # raw frames go into one file, in order, so one writer; png files can be written in parallel.
+        self.writers = [threading.Thread(target=self.write, daemon=True) for i in range(1 if self.stream else writers)]
+        for writer in self.writers:
+            writer.start()
+
+    def capture(self, renderer, area, frame_time): # render thread, with the buffer as the target.
+        self.count += 1
+        self.allowance = min(self.allowance + self.share * frame_time, self.share * frame_time * 2)
+        if (self.count - 1) % self.every:
+            return
+        if self.allowance < 0:
+            self.skipped += 1
+            return
+        size = tuple(area[2:])
+        if size != self.size: # first frame or resized: a new pool, old Surfaces are dropped as they come back.
+            if self.stream and self.size: # and a new raw file; frames queued already go to the old one.
+                name = f"frames-{size[0]}x{size[1]}-{len(self.streams)}.rgba"
+                self.stream = open(os.path.join(self.output, name), "wb")
+                self.streams.append(self.stream)
+                print(f"Recorder: resized to {size[0]}x{size[1]}, raw frames continue in {name}.")
+            self.size = size
+            self.free = queue.Queue()
+            for i in range(self.pool_size):
+                self.free.put(pygame.Surface(size, 0, 32))
+        try:
+            surface = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            return
+        start = time.perf_counter()
+        renderer.to_surface(surface, area)
+        spent = time.perf_counter() - start
+        self.readback += spent
+        self.allowance -= spent
+        try: # only full right after a resize, with the old pool still queued.
+            self.frames.put_nowait((self.recorded, surface, self.free, self.stream))
+        except queue.Full:
+            self.free.put(surface)
+            self.dropped += 1
+            return
+        self.recorded += 1
+        self.deepest = max(self.deepest, self.frames.qsize())
+
+    def write(self): # writer thread.
+        while True:
+            item = self.frames.get()
+            if item is None:
+                return
+            number, surface, pool, stream = item
+            if stream:
+                stream.write(pygame.image.tostring(surface, "RGBA"))
+            else:
+                pygame.image.save(surface, os.path.join(self.output, f"{number:06d}.png"))
+            pool.put(surface) # back to the pool it came from.
+
+    def close(self): # waits for the writers to finish what is queued.
+        for writer in self.writers:
+            self.frames.put(None)
+        for writer in self.writers:
+            writer.join()
+        for stream in self.streams:
+            stream.close()
+
+    def report(self):
+        mean = self.readback / self.recorded * 1000 if self.recorded else 0
+        return (f"Recorder: {self.recorded} frames recorded to {self.output}, {self.dropped} dropped (writers behind), "
+                f"{self.skipped} skipped (over {self.share:.0%} of frame time), queue depth up to {self.deepest} "
+                f"of {self.pool_size}, {mean:.2f} ms per readback.")
@@ -1,7 +1,13 @@
 import pygame._sdl2
 import os
-from random import randint
-from math import cos, sin, pi
+import queue
+import threading
+import weakref
+import asset_cache
+import atlas
+import motion
+import numpy
+from math import pi, log
 
 effects = os.path.dirname(os.path.realpath(__file__)) + "/effects/"
 
@@ -10,15 +16,21 @@ renderer = None
 settings = None
 screen = None
 
+# update(), move() and resize() take dt, the seconds since the last frame. Speeds are still given
+# per tick: 1/144 s, the frame rate everything was tuned at. So a fade_speed of 10 adds 10 opacity
+# every 1/144 s at any frame rate, and a slow frame just moves things further.
+TICK = 1 / 144
+
 # movable and resizable image that can rotate.
 class Sprite:
 
     def __init__(self, item, pos=(0,0), initial_scale=1, fade_speed=10, spin_speed=0, control_speed=4):
-        self.img_ref = pygame.image.load(effects + item) # reference image
-        self.original_size = self.img_ref.get_size() # reference size for scaling.
+        self.file = effects + item
+        self.TEXTURE = asset_cache.load_texture(self.file) # shared with other users of the file.
+        self.opaque = asset_cache.is_opaque(self.file)
+        self.original_size = (self.TEXTURE.width, self.TEXTURE.height) # reference size for scaling.
         self.original_pos = pos
         self.w, self.h = self.original_size[0]*initial_scale, self.original_size[1]*initial_scale
-        self.TEXTURE = pygame._sdl2.Texture.from_surface(renderer, self.img_ref)
         self.spin_speed = spin_speed
         self.control_speed = control_speed
         self.pos = pos
@@ -27,33 +39,44 @@ class Sprite:
         self.opacity = 0
         self.fade_speed = -fade_speed # flips when calling toggle()
 
-    def update(self):
-        self.automate_movement() # inherited class defines this.
-        self.opacity += self.fade_speed
+    def update(self, dt=TICK):
+        self.automate_movement(dt) # inherited class defines this.
+        self.opacity += self.fade_speed * dt / TICK
         if self.opacity > 255:
             self.opacity = 255
         elif self.opacity < 0:
             self.opacity = 0
         if self.spin_speed:
-            self.theta = (self.theta + self.spin_speed) % 360
-        self.TEXTURE.alpha = self.opacity
+            self.theta = (self.theta + self.spin_speed * dt / TICK) % 360
+        self.TEXTURE.alpha = int(self.opacity)
         return {"dstrect": self.rect, "angle": self.theta}
 
-    def move(self, diff):
-        self.pos = self.pos[0] + diff[0]*self.control_speed, self.pos[1] + diff[1]*self.control_speed
+    def move(self, diff, dt=TICK):
+        step = self.control_speed * dt / TICK
+        self.pos = self.pos[0] + diff[0]*step, self.pos[1] + diff[1]*step
         self.rect.center = self.pos
 
-    def resize(self, order):
+    def resize(self, order, dt=TICK):
         if order == 0 or (order < 0 and self.w <= 1): # don't resize too small.
             return
+        order *= dt / TICK
         self.w = self.w + order * 3 * self.w / self.original_size[0] * self.w/self.h # aspect ratio.
         self.h = self.h + order * 3 * self.h / self.original_size[1]
         self.rect = pygame.Rect(*self.pos, self.w, self.h)
         self.rect.center = self.pos
 
-    def automate_movement(self): # for inheritance.
+    def automate_movement(self, dt): # for inheritance.
         pass
 
+    def reload(self, path, kind): # the file changed on disk. keeps the current size on screen.
+        if path == self.file and kind != "removed":
+            self.TEXTURE = asset_cache.load_texture(self.file)
+            self.opaque = asset_cache.is_opaque(self.file)
+
+    def covers(self): # the screen rect hidden under this sprite, if it is opaque, upright and fully faded in.
+        if self.opaque and self.theta == 0 and self.opacity >= 255 and self.fade_speed > 0:
+            return self.rect
+
     def reset(self): # set all parameters to starting ones.
         self.pos = self.original_pos
         self.w, self.h = self.original_size[0], self.original_size[1]
@@ -64,24 +87,15 @@ class Sprite:
         print(f"{self.__class__.__name__} is {self.fade_speed > 0}")
 
 # animates a sprite on a circular path while spinning.
-class ArcSprite(Sprite):
+class ArcSprite(Sprite): # speed in degrees per tick, moved by motion.engine.
 
     def __init__(self, item, origin=(0,0), axes=(300,300), speed=0.5, start_angle=0, spin_speed=0):
         super().__init__(item, origin, 10, spin_speed)
         self.origin = origin
         self.axes = axes
         self.speed = speed
-        self.phi = start_angle
-
-    def arc_pos(self):
-        x = self.axes[0] * cos(self.phi * pi / 180) + self.origin[0]
-        y = self.axes[1] * sin(self.phi * pi / 180) + self.origin[1]
-        return (x,y)
-
-    def automate_movement(self):
-        self.phi = (self.phi + self.speed) % 360
-        self.pos = self.arc_pos()
-        self.rect.center = self.pos
+        period = 360 * TICK / speed if speed else float("inf")
+        motion.engine.add(self, motion.arc(axes, period), origin=origin, phase=start_angle / 360)
 
 class SweepSprite(Sprite): # back and forth.
     def __init__(self, item, origin=(0,0), rate=0.5, width=300, spin_speed=0):
@@ -89,112 +103,219 @@ class SweepSprite(Sprite): # back and forth.
         self.origin = origin
         self.width = width
         self.rate = rate
-        self.phi = 0
-
-    def sway_pos(self):
-        x = self.width * sin(self.phi * pi / 180) + self.origin[0]
-        y = self.origin[1]
-        return (x,y)
-
-    def automate_movement(self):
-        self.phi = (self.phi + self.rate) % 360
-        self.pos = self.sway_pos()
-
-# draw n minsize-maxsize small circles at random positions.
-# toggle to redraw if resizing window.
+        period = 360 * TICK / rate if rate else float("inf")
+        motion.engine.add(self, motion.sinusoid((width, 0), period), origin=origin)
+
+# n stars of radius minsize-maxsize in a few depth layers. positions, sizes and brightness live in
+# numpy arrays and are drawn into the layers in bulk; bigger stars are nearer and drift faster
+# (drift is the nearest layer's speed, px per tick). each depth is split into twinkle_groups
+# textures whose alpha pulses out of phase, so the sky twinkles without redrawing anything.
+# both are off by default: a still sky is one layer, a drifting one a layer per depth.
+# positions are kept in 0-1, so rescale() only redraws the same sky at the new size.
 class Stars:
 
-    def __init__(self, n=400, minsize=1, maxsize=4):
+    def __init__(self, n=400, minsize=1, maxsize=4, depths=3, drift=(0,0), twinkle=0, twinkle_groups=2):
         self.opacity = 0
         self.fade_speed = -3
         self.minsize = minsize
         self.maxsize = maxsize
         self.n = n
+        self.depths = min(depths, maxsize - minsize + 1)
+        self.drift = drift
+        self.twinkle = twinkle
+        self.twinkle_groups = twinkle_groups if twinkle else 1
+        self.timer = 0 # ticks, drives drift and twinkle.
         self.dimensions = screen.size
-        self.surf = pygame.Surface(self.dimensions)
         self.create_stars()
 
     def create_stars(self):
-        self.surf.fill(0)
-        self.surf.set_colorkey((0,0,0))
-        self.stars = []
-        for i in range(self.n):
-            size = randint(self.minsize,self.maxsize)
-            self.stars.append({"position": (randint(0,self.dimensions[0]), randint(0,self.dimensions[1])), "size": size})
-        for star in self.stars:
-            pygame.draw.circle(self.surf, (255,)*3, star["position"], star["size"])
-        self.TEXTURE = pygame._sdl2.Texture.from_surface(renderer, self.surf)
-
-    def update(self):
-        self.opacity += self.fade_speed
+        rng = numpy.random.default_rng()
+        self.positions = rng.random((self.n, 2))
+        self.sizes = rng.integers(self.minsize, self.maxsize + 1, self.n)
+        self.depth = (self.sizes - self.minsize) * self.depths // (self.maxsize - self.minsize + 1)
+        self.brightness = rng.uniform(0.5, 1, self.n) * (0.6 + 0.4 * (self.depth + 1) / self.depths)
+        self.group = rng.integers(0, self.twinkle_groups, self.n)
+        self.rates = rng.uniform(0.004, 0.012, self.twinkle_groups) # twinkles per tick.
+        self.draw_stars()
+
+    def draw_stars(self): # one white, per-pixel alpha layer per (depth, group). they tile, for the drift.
+        w, h = self.dimensions
+        x = (self.positions[:,0] * w).astype(int)
+        y = (self.positions[:,1] * h).astype(int)
+        alpha = (self.brightness * 255).astype(numpy.uint8)
+        self.layers = []
+        drifting = any(self.drift) # else every depth shares one layer.
+        for depth in range(self.depths if drifting else 1):
+            for group in range(self.twinkle_groups):
+                surf = pygame.Surface(self.dimensions, pygame.SRCALPHA)
+                surf.fill((255,255,255,0))
+                pixels = pygame.surfarray.pixels_alpha(surf)
+                chosen = numpy.flatnonzero(((self.depth == depth) | (not drifting)) & (self.group == group))
+                chosen = chosen[numpy.argsort(alpha[chosen])] # brighter stars drawn last, on top.
+                for size in numpy.unique(self.sizes[chosen]):
+                    stars = chosen[self.sizes[chosen] == size]
+                    dx, dy = disc(size)
+                    pixels[(x[stars,None] + dx) % w, (y[stars,None] + dy) % h] = alpha[stars,None]
+                del pixels # unlocks the surface.
+                texture = asset_cache.upload(surf)
+                texture.blend_mode = 1
+                self.layers.append((depth, group, texture))
+        self.TEXTURE = self.layers[0][2]
+
+    def update(self, dt=TICK):
+        self.opacity += self.fade_speed * dt / TICK
         if self.opacity > 255:
             self.opacity = 255
         elif self.opacity < 0:
             self.opacity = 0
-        self.TEXTURE.alpha = self.opacity
+        self.timer += dt / TICK
         return {"dstrect": (0,0)}
 
+    def draw(self, dt=TICK):
+        self.update(dt)
+        w, h = self.dimensions
+        pulse = self.twinkle * (0.5 + 0.5 * numpy.sin(2 * pi * (self.timer * self.rates + numpy.arange(self.twinkle_groups) / self.twinkle_groups)))
+        for depth, group, texture in self.layers:
+            speed = (depth + 1) / self.depths
+            ox = int(self.drift[0] * speed * self.timer) % w
+            oy = int(self.drift[1] * speed * self.timer) % h
+            texture.alpha = int(self.opacity * (1 - pulse[group]))
+            for x in (ox, ox - w) if ox else (0,): # the layer wraps around the window.
+                for y in (oy, oy - h) if oy else (0,):
+                    texture.draw(dstrect=(x, y))
+
+    def rescale(self, dimensions): # window was resized: redraw the same stars at the new size.
+        self.dimensions = dimensions
+        self.draw_stars()
+
     def reset(self):
         pass
 
     def toggle(self):
-        if self.opacity == 0 and self.surf.get_size() != screen.size:
-            self.dimensions = screen.size
-            self.surf = pygame.Surface(self.dimensions)
-            self.create_stars()
+        if self.opacity == 0 and self.dimensions != screen.size:
+            self.rescale(screen.size)
         self.fade_speed *= -1
         self.opacity += self.fade_speed
         print(f"Stars is {self.fade_speed > 0}")
 
+def disc(radius): # pixel offsets of a filled circle, like pygame.draw.circle. cached per radius.
+    if radius in DISCS:
+        return DISCS[radius]
+    dx, dy = numpy.mgrid[-radius:radius, -radius:radius]
+    inside = (dx + 0.5)**2 + (dy + 0.5)**2 <= radius**2
+    DISCS[radius] = dx[inside], dy[inside]
+    return DISCS[radius]
+
+DISCS = {}
+
+# a black cover over everything but a light image that follows the cursor. all images in
+# spotlights/ are loaded up front, so select() only swaps textures. sizes are kept in steps of
+# SPOTLIGHT_STEP, each loaded pre-scaled once (asset_cache keeps them), and the light is composed
+# with a black border into a texture of its own size, redrawn only when the image or the step
+# changes. drawing the spotlight is that quad at the cursor and the stretched cover around it.
+SPOTLIGHT_STEP = 1.05
+SPOTLIGHT_MARGIN = 1 # px of black around the light in CANVAS.
+
 class Spotlight:
     def __init__(self, light_texture, resolution=(1920,1080)):
-        self.cover = pygame.Surface(resolution)
-        self.light = pygame.image.load(os.path.dirname(os.path.realpath(__file__)) + "/spotlights/" + light_texture)
-        self.cover.set_colorkey((1,2,3)) # needed for alpha.
-        self.COVER_TEXTURE = pygame._sdl2.Texture.from_surface(renderer, self.cover)
-        self.TEXTURE = pygame._sdl2.Texture.from_surface(renderer, self.light)
-        self.TEXTURE.blend_mode = 4
-        self.original_size = self.light.get_size() # we use this to control the 1/r scaling.
-        self.w, self.h = self.light.get_size()
-        self.x, self.y = 0, 0
+        self.path = os.path.dirname(os.path.realpath(__file__)) + "/spotlights/"
+        self.files = settings.catalog.list("spotlights")
+        for file in self.files: # preload, switching is then a cache hit.
+            asset_cache.load_texture(self.path + file)
+        cover = pygame.Surface((1,1)) # stretched over the window.
+        self.COVER_TEXTURE = asset_cache.upload(cover)
+        self.COVER_TEXTURE.blend_mode = 1
+        self.CANVAS = None # the light with its black border, see compose().
+        self.composed = None # what CANVAS holds: (file, step).
+        self.scale = 1
         self.opacity = 0
         self.fade_speed = -3
-
-    def draw(self):
+        self.select(self.files.index(light_texture))
+
+    def select(self, index):
+        self.index = index
+        self.TEXTURE = asset_cache.load_texture(self.path + self.files[index])
+        self.original_size = (self.TEXTURE.width, self.TEXTURE.height) # we use this to control the 1/r scaling.
+        self.w, self.h = self.size()
+
+    def reload(self, path, kind): # a file in spotlights/ was added, saved or removed.
+        name, current = os.path.basename(path), self.files[self.index]
+        if kind == "added":
+            self.files = sorted(self.files + [name])
+        elif kind == "removed" and name != current: # the one in use stays until switched away from.
+            self.files.remove(name)
+        if kind != "removed":
+            asset_cache.load_texture(path)
+        self.select(self.files.index(current))
+        self.invalidate()
+
+    def step(self): # scale rounded to a whole number of SPOTLIGHT_STEPs.
+        return round(log(self.scale, SPOTLIGHT_STEP))
+
+    def size(self):
+        scale = SPOTLIGHT_STEP ** self.step()
+        return max(1, round(self.original_size[0] * scale)), max(1, round(self.original_size[1] * scale))
+
+    def compose(self): # the light in the middle of a black canvas SPOTLIGHT_MARGIN larger all round.
+        key = (self.files[self.index], self.step())
+        if key == self.composed:
+            return
+        light = asset_cache.load_texture(self.path + self.files[self.index], SPOTLIGHT_STEP ** self.step())
+        size = (light.width + 2 * SPOTLIGHT_MARGIN, light.height + 2 * SPOTLIGHT_MARGIN)
+        if not self.CANVAS or (self.CANVAS.width, self.CANVAS.height) != size:
+            self.CANVAS = pygame._sdl2.Texture(renderer, size, target=True)
+            self.CANVAS.blend_mode = 4 # modulate: black hides, the light tints what is under it.
+        light.blend_mode = 0
+        previous = renderer.target
+        renderer.target = self.CANVAS
+        renderer.draw_color = (0,0,0,255)
+        renderer.clear()
+        light.draw(dstrect=(SPOTLIGHT_MARGIN, SPOTLIGHT_MARGIN))
+        renderer.target = previous
+        self.composed = key
+
+    def draw(self, dt=TICK):
         if self.opacity == 0:
             return
-        self.set_alpha()
-        self.make_rects()
-        for rect in self.surround_rects:
-            self.COVER_TEXTURE.draw(dstrect=rect)
-        if self.opacity >= 255:
-            self.TEXTURE.draw(dstrect=self.main_rect)
-
-    def set_alpha(self):
-        self.opacity += self.fade_speed
+        self.set_alpha(dt)
+        w, h = settings.resolution
+        if self.opacity < 255: # blend_mode 4 forbids alpha, so the light stays hidden until the cover is fully opaque.
+            self.COVER_TEXTURE.draw(dstrect=(0, 0, w, h))
+            return
+        self.compose()
+        x, y = pygame.mouse.get_pos()
+        light = self.CANVAS.get_rect(center=(x, y))
+        self.CANVAS.draw(dstrect=light)
+        light = light.clip((0, 0, w, h))
+        if not light: # off screen: all cover.
+            self.COVER_TEXTURE.draw(dstrect=(0, 0, w, h))
+            return
+        for cover in ((0, 0, w, light.top), (0, light.bottom, w, h - light.bottom), # above, below,
+                      (0, light.top, light.left, light.h), (light.right, light.top, w - light.right, light.h)): # left, right.
+            if cover[2] > 0 and cover[3] > 0:
+                self.COVER_TEXTURE.draw(dstrect=cover)
+
+    def set_alpha(self, dt):
+        self.opacity += self.fade_speed * dt / TICK
         if self.opacity > 255:
             self.opacity = 255
         elif self.opacity < 0:
             self.opacity = 0
-        self.COVER_TEXTURE.alpha = self.opacity
-        self.TEXTURE.alpha = self.opacity
+        self.COVER_TEXTURE.alpha = int(self.opacity)
 
-    def make_rects(self): # draw spotlight and black AROUND it to circumvent poor additive blending.
-        x, y = pygame.mouse.get_pos()
-        self.x = x - self.w//2
-        self.y = y - self.h//2
-        self.main_rect = pygame.Rect(self.x, self.y, self.w, self.h)
-        self.surround_rects = [pygame.Rect(0, 0, settings.resolution[0], self.y),
-                               pygame.Rect(0, self.h + self.y, settings.resolution[0], settings.resolution[0] - self.y - self.h),
-                               pygame.Rect(0, self.y, self.x, self.h),
-                               pygame.Rect(self.x + self.w, self.y, settings.resolution[0] - self.x - self.w, self.h)]
-        if self.opacity < 255: # blend_mode 4 forbids alpha, so we hide the image until the background is fully opaque.
-            self.surround_rects.append(pygame.Rect(self.x, self.y, self.w, self.h))
-
-    def resize(self, order):
+    def opening(self): # while the cover is fully up, nothing under it shows outside this rect.
+        if self.opacity >= 255 and self.fade_speed > 0:
+            x, y = pygame.mouse.get_pos()
+            return pygame.Rect(x - self.w//2, y - self.h//2, self.w, self.h)
+
+    def invalidate(self): # compose again, e.g. after the GPU lost render targets.
+        self.composed = None
+
+    def resize(self, order, dt=TICK):
         if self.w >= 1 and self.h >= 1:
-            self.w = self.w + order * 3 * (self.w / self.original_size[0])
-            self.h = self.w + order * 3 * (self.h / self.original_size[1])
+            order *= dt / TICK
+            self.scale = max(SPOTLIGHT_STEP ** -60, self.scale + order * 3 * self.scale / self.original_size[0])
+            self.w, self.h = self.size()
 
     def reset(self):
         pass
@@ -204,32 +325,156 @@ class Spotlight:
         self.opacity += self.fade_speed
         print(f"Spot is {self.fade_speed > 0}")
 
+# a fountain of copies of one image from effects/. every particle's position, velocity, scale,
+# angle, spin, opacity, age and lifetime sit in numpy arrays and move in one vectorized step per
+# frame; only the draw calls are per particle, all from one shared texture. speeds are per tick,
+# like everywhere else: rate is new particles per tick, lifetime is in ticks, direction and
+# spread in degrees (270 is up), gravity in px per tick per tick. move() moves the source,
+# resize() scales all particles, toggle() starts or stops emitting (and fires a burst).
+class Emitter:
+
+    def __init__(self, item, pos=(0,0), rate=1, max_particles=5000, lifetime=(150, 300), speed=(1, 4), direction=270,
+                 spread=60, gravity=0.02, scale=(0.05, 0.2), spin=(-3, 3), burst=0, fade_speed=10, control_speed=4):
+        self.file = effects + item
+        self.TEXTURE = asset_cache.load_texture(self.file) # shared with other users of the file.
+        self.TEXTURE.blend_mode = 1
+        self.original_size = (self.TEXTURE.width, self.TEXTURE.height)
+        self.original_pos = pos
+        self.pos = pos
+        self.rate, self.lifetime_range, self.speed_range, self.scale_range, self.spin_range = rate, lifetime, speed, scale, spin
+        self.direction, self.spread, self.gravity, self.burst = direction, spread, gravity, burst
+        self.control_speed = control_speed
+        self.size = 1 # resize() factor on top of each particle's scale.
+        self.opacity = 0
+        self.fade_speed = -fade_speed # flips when calling toggle()
+        self.rng = numpy.random.default_rng()
+        self.positions = numpy.zeros((max_particles, 2))
+        self.velocities = numpy.zeros((max_particles, 2))
+        self.scales = numpy.zeros(max_particles)
+        self.angles = numpy.zeros(max_particles)
+        self.spins = numpy.zeros(max_particles)
+        self.opacities = numpy.zeros(max_particles)
+        self.ages = numpy.zeros(max_particles)
+        self.lifetimes = numpy.ones(max_particles)
+        self.count = 0 # live particles are the first count entries.
+        self.carry = 0 # fractional particles owed by rate.
+
+    def emit(self, n):
+        n = min(n, len(self.ages) - self.count)
+        new = slice(self.count, self.count + n)
+        heading = numpy.radians(self.direction + self.rng.uniform(-self.spread / 2, self.spread / 2, n))
+        speed = self.rng.uniform(*self.speed_range, n)
+        self.positions[new] = self.pos
+        self.velocities[new, 0] = numpy.cos(heading) * speed
+        self.velocities[new, 1] = numpy.sin(heading) * speed
+        self.scales[new] = self.rng.uniform(*self.scale_range, n)
+        self.angles[new] = self.rng.uniform(0, 360, n)
+        self.spins[new] = self.rng.uniform(*self.spin_range, n)
+        self.ages[new] = 0
+        self.lifetimes[new] = self.rng.uniform(*self.lifetime_range, n)
+        self.count += n
+
+    def update(self, dt=TICK):
+        step = dt / TICK
+        self.opacity += self.fade_speed * step
+        if self.opacity > 255:
+            self.opacity = 255
+        elif self.opacity < 0:
+            self.opacity = 0
+        if self.fade_speed > 0:
+            self.carry += self.rate * step
+            self.emit(int(self.carry))
+            self.carry %= 1
+        live = slice(0, self.count)
+        self.ages[live] += step
+        alive = numpy.flatnonzero(self.ages[live] < self.lifetimes[live])
+        if len(alive) < self.count: # compact: the survivors move to the front, in order.
+            for array in (self.positions, self.velocities, self.scales, self.angles, self.spins, self.ages, self.lifetimes):
+                array[:len(alive)] = array[alive]
+            self.count = len(alive)
+            live = slice(0, self.count)
+        self.velocities[live, 1] += self.gravity * step
+        self.positions[live] += self.velocities[live] * step
+        self.angles[live] = (self.angles[live] + self.spins[live] * step) % 360
+        # fade in over the first 10 ticks, out over the last third of the lifetime.
+        life = numpy.minimum(self.ages[live] / 10, 3 * (1 - self.ages[live] / self.lifetimes[live]))
+        self.opacities[live] = numpy.clip(life, 0, 1) * self.opacity
+
+    def draw(self, dt=TICK):
+        self.update(dt)
+        live = slice(0, self.count)
+        w = self.original_size[0] * self.scales[live] * self.size
+        h = self.original_size[1] * self.scales[live] * self.size
+        x = self.positions[live, 0] - w / 2
+        y = self.positions[live, 1] - h / 2
+        alpha = (self.opacities[live].astype(int) + 8) >> 4 # 17 levels: one alpha change per level, not per particle.
+        order = numpy.argsort(alpha, kind="stable")
+        rects = numpy.column_stack((x, y, w, h)).astype(int)[order].tolist()
+        angles = self.angles[live][order].tolist()
+        levels, starts = numpy.unique(alpha[order], return_index=True)
+        bounds = starts.tolist() + [self.count]
+        draw = self.TEXTURE.draw
+        for level, start, stop in zip(levels.tolist(), bounds, bounds[1:]):
+            if level == 0: # rounds to invisible.
+                continue
+            self.TEXTURE.alpha = min(255, level * 16)
+            for i in range(start, stop):
+                draw(dstrect=rects[i], angle=angles[i])
+
+    def move(self, diff, dt=TICK):
+        step = self.control_speed * dt / TICK
+        self.pos = self.pos[0] + diff[0]*step, self.pos[1] + diff[1]*step
+
+    def reload(self, path, kind):
+        if path == self.file and kind != "removed":
+            self.TEXTURE = asset_cache.load_texture(self.file)
+            self.TEXTURE.blend_mode = 1
+
+    def resize(self, order, dt=TICK):
+        if order == 0 or (order < 0 and self.size <= 0.05): # don't resize too small.
+            return
+        self.size = max(0.05, self.size + order * 0.01 * dt / TICK)
+
+    def reset(self):
+        self.pos = self.original_pos
+        self.size = 1
+        self.count = 0
+
+    def toggle(self):
+        self.fade_speed *= -1
+        if self.fade_speed > 0:
+            self.emit(self.burst)
+        self.opacity += self.fade_speed
+        print(f"{self.__class__.__name__} is {self.fade_speed > 0}")
+
 # 4 (or 8) directions. like in a video game.
 # order in directory: E, S, W, N, NE, SE, SW, NW.
 class SpriteSheet:
     def __init__(self, speed = 3):
         path = os.path.dirname(os.path.realpath(__file__)) + "/directional_sprites"
         images = os.listdir(path)
-        self.images = [pygame.image.load(path + "/" + image) for image in images]
+        frames = atlas.load(path, [path + "/" + image for image in images]) # (texture, srcrect) each.
         self.pos = settings.center
-        self.rect = self.images[0].get_rect(center=self.pos)
+        self.rect = frames[0][1].copy()
+        self.rect.center = self.pos
         self.directions = [(1,0), (0,1), (-1,0), (0,-1), (1,-1), (1,1), (-1,1), (-1,-1)]
-        self.TEXTURES = {key: pygame._sdl2.Texture.from_surface(renderer, image) for key, image in zip(self.directions, self.images)}
-        self.TEXTURE = self.TEXTURES[(1,0)] # start right.
+        self.TEXTURES = {key: frame for key, frame in zip(self.directions, frames)}
+        self.TEXTURE, self.srcrect = self.TEXTURES[(1,0)] # start right.
         self.speed = speed
         self.opacity = 0
 
-    def update(self):
-        return {"dstrect": self.rect}
+    def update(self, dt=TICK):
+        return {"srcrect": self.srcrect, "dstrect": self.rect}
 
-    def move(self, diff):
+    def move(self, diff, dt=TICK):
+        step = self.speed * dt / TICK
         if diff != [0,0]:
             if len(self.TEXTURES) == 4 and abs(diff[0]) + abs(diff[1]) <= 1:
-                self.pos = self.pos[0] + diff[0]*self.speed, self.pos[1] + diff[1]*self.speed
-                self.TEXTURE = self.TEXTURES[tuple(diff)]
+                self.pos = self.pos[0] + diff[0]*step, self.pos[1] + diff[1]*step
+                self.TEXTURE, self.srcrect = self.TEXTURES[tuple(diff)]
             elif len(self.TEXTURES) == 8:
-                self.pos = self.pos[0] + diff[0]*self.speed, self.pos[1] + diff[1]*self.speed
-                self.TEXTURE = self.TEXTURES[tuple(diff)]
+                self.pos = self.pos[0] + diff[0]*step, self.pos[1] + diff[1]*step
+                self.TEXTURE, self.srcrect = self.TEXTURES[tuple(diff)]
             self.rect.center = self.pos
 
     def reset(self): # consistency. now we can loop through all effects and reset().
@@ -244,45 +489,64 @@ class SpriteSheet:
 class Animation:
     def __init__(self, dirname, frametime=10, pos=(0,0), control_speed=3, scale=1, fade_speed=5):
         path = os.path.dirname(os.path.realpath(__file__)) + "/animations/" + dirname
-        images = [pygame.image.load(path + "/" + image) for image in os.listdir(path)]
+        self.path = path
+        self.files = [path + "/" + image for image in os.listdir(path)]
+        self.TEXTURE, self.srcrect = self.load_frames()
         self.theta = 0
         self.scale = scale
-        self.original_size = images[0].get_size()
+        self.original_size = self.srcrect.size
         self.original_pos = pos # for reset()
         self.w, self.h = self.scale*self.original_size[0], self.scale*self.original_size[1]
-        self.TEXTURES = [pygame._sdl2.Texture.from_surface(renderer, image) for image in images]
-        self.TEXTURE = self.TEXTURES[0]
         self.pos = pos
         # self.rect = images[0].get_rect(center=self.pos)
         self.rect = pygame.Rect(*self.pos, self.w, self.h)
         self.rect.center = self.pos
         self.control_speed = control_speed
-        self.frametime = frametime # per image.
-        self.timer = 0 # takes care of flipping through the images.
+        self.frametime = frametime # ticks per image.
+        self.timer = 0 # ticks into the loop. takes care of flipping through the images.
         self.opacity = 0
         self.fade_speed = -fade_speed
 
-    def update(self):
+    def load_frames(self): # every frame up front, packed into an atlas (see atlas.py). returns the first one.
+        self.FRAMES = atlas.load(self.path, self.files)
+        return self.FRAMES[0]
+
+    def frame(self, index): # (texture, srcrect)
+        return self.FRAMES[index]
+
+    def reload(self, path, kind): # a frame was added, saved or removed: the atlas is rebuilt.
+        if os.path.dirname(path) != self.path:
+            return
+        if kind == "added":
+            self.files.append(path)
+        elif kind == "removed" and path in self.files and len(self.files) > 1:
+            self.files.remove(path)
+        self.FRAMES = atlas.load(self.path, self.files)
+        self.timer %= self.frametime * len(self.files)
+
+    def update(self, dt=TICK):
         if self.opacity == 0:
             return
-        self.opacity += self.fade_speed
+        self.opacity += self.fade_speed * dt / TICK
         if self.opacity > 255:
             self.opacity = 255
         elif self.opacity < 0:
             self.opacity = 0
-        self.TEXTURE.alpha = self.opacity
-        self.timer = (self.timer + 1) % (self.frametime * len(self.TEXTURES))
-        self.TEXTURE = self.TEXTURES[self.timer // self.frametime]
+        self.timer = (self.timer + dt / TICK) % (self.frametime * len(self.files))
+        self.TEXTURE, self.srcrect = self.frame(int(self.timer // self.frametime))
+        self.TEXTURE.alpha = int(self.opacity) # after the switch: frames are shared between instances.
         self.rect.center = self.pos # if pos is manipulated outside the class, the object will move without invoking move()
-        return {"dstrect": self.rect, "angle": self.theta}
+        return {"srcrect": self.srcrect, "dstrect": self.rect, "angle": self.theta}
         
-    def move(self, diff):
-        self.pos = self.pos[0] + diff[0]*self.control_speed, self.pos[1] + diff[1]*self.control_speed
+    def move(self, diff, dt=TICK):
+        step = self.control_speed * dt / TICK
+        self.pos = self.pos[0] + diff[0]*step, self.pos[1] + diff[1]*step
         self.rect.center = self.pos
 
-    def resize(self, order):
+    def resize(self, order, dt=TICK):
         if order == 0 or (order < 0 and self.w <= 1): # don't resize too small.
             return
+        order *= dt / TICK
         self.w = self.w + order * 3 * self.w / self.original_size[0] * self.w/self.h # aspect ratio.
         self.h = self.h + order * 3 * self.h / self.original_size[1]
         self.rect = pygame.Rect(*self.pos, self.w, self.h)
@@ -299,4 +563,91 @@ class Animation:
 
     def deprecated_toggle(self):
         self.opacity = 1 if self.opacity == 0 else 0
-        print(f"Animation is {self.opacity > 0}")
\ No newline at end of file
+        print(f"Animation is {self.opacity > 0}")
+# an Animation that streams its frames from disk instead of loading them all, for long hand-drawn
+# sequences: it starts at once and uses the same memory whatever the length. a worker thread
+# decodes the frames just ahead of the playhead into a ring of ring_size textures, capped at
+# memory_cap MB (ring plus decoded frames waiting for upload). a frame that isn't ready in time
+# leaves the previous one up a little longer.
+class StreamingAnimation(Animation):
+    def __init__(self, dirname, frametime=10, pos=(0,0), control_speed=3, scale=1, fade_speed=5, ring_size=32, memory_cap=256):
+        self.ring_size = ring_size
+        self.memory_cap = memory_cap
+        super().__init__(dirname, frametime, pos, control_speed, scale, fade_speed)
+
+    def load_frames(self): # only the first frame here, the worker does the rest.
+        first = asset_cache.load_surface(self.files[0])
+        self.size = first.get_size()
+        self.whole = pygame.Rect((0,0), self.size) # srcrect: every slot holds one whole frame.
+        slots = self.memory_cap * 2**20 // (2 * self.size[0] * self.size[1] * 4)
+        self.ring = [pygame._sdl2.Texture(renderer, self.size, streaming=True) for i in range(max(2, min(self.ring_size, len(self.files), slots)))]
+        for texture in self.ring:
+            texture.blend_mode = 1
+        self.ring_files = [-1] * len(self.ring) # which file each slot holds.
+        asset_cache.upload_into(self.ring[0], first)
+        self.ring_files[0] = 0
+        self.sequence = 0 # frames played so far, counting through loops. slot = sequence % ring.
+        self.last_index = 0
+        self.shown = self.ring[0]
+        self.decoded = queue.Queue() # (sequence, Surface) waiting for upload on the render thread.
+        self.ahead = threading.Condition() # the worker waits on this for the playhead to move.
+        self.stopped = False
+        threading.Thread(target=StreamingAnimation.decode, args=(weakref.ref(self), self.ahead), daemon=True).start()
+        return self.frame(0)
+
+    def stop(self): # ends the worker. it also ends by itself once the animation is no longer used.
+        with self.ahead:
+            self.stopped = True
+            self.ahead.notify()
+
+    def reload(self, path, kind): # saved frames are read as they come up, only the list changes.
+        if os.path.dirname(path) != self.path:
+            return
+        if kind == "added":
+            self.files.append(path)
+        elif kind == "removed" and path in self.files and len(self.files) > 1:
+            self.files.remove(path)
+
+    # worker thread: stays at most one ring ahead of the playhead. holds the animation only weakly
+    # while waiting, so a discarded one can be collected, and the worker then ends.
+    @staticmethod
+    def decode(ref, ahead):
+        n = 1
+        while True:
+            with ahead:
+                while True:
+                    anim = ref()
+                    if anim is None or anim.stopped:
+                        return
+                    if n < anim.sequence + len(anim.ring):
+                        break
+                    anim = None
+                    ahead.wait(1)
+                n = max(n, anim.sequence) # fell behind: skip what has been played already.
+            files = list(anim.files) # reload() may change the list meanwhile.
+            file = files[n % len(files)]
+            if anim.ring_files[n % len(anim.ring)] != n % len(files): # not there from the last loop.
+                try:
+                    surface = asset_cache.load_surface(file)
+                    if surface.get_size() != anim.size:
+                        surface = pygame.transform.scale(surface, anim.size)
+                    anim.decoded.put((n, surface))
+                except (pygame.error, OSError, ValueError) as e: # removed or half saved: the last frame stays up.
+                    print(f"Could not decode {file}: {e}.")
+            anim = None
+            n += 1
+
+    def frame(self, index):
+        while not self.decoded.empty(): # upload what the worker has ready.
+            n, surface = self.decoded.get()
+            if n >= self.sequence:
+                asset_cache.upload_into(self.ring[n % len(self.ring)], surface)
+                self.ring_files[n % len(self.ring)] = n % len(self.files)
+        if index != self.last_index: # move the playhead, which lets the worker decode further.
+            with self.ahead:
+                self.sequence += (index - self.last_index) % len(self.files)
+                self.ahead.notify()
+            self.last_index = index
+        if self.ring_files[self.sequence % len(self.ring)] == index:
+            self.shown = self.ring[self.sequence % len(self.ring)]
+        return self.shown, self.whole
@@ -1,11 +1,27 @@
 import pygame._sdl2
 import pygame.locals
 import os
+import sys
+import queue
+import threading
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from random import randint
 from itertools import product
 import math
+import numpy
 import sub_effects
 import automatic_movers
+import motion
+import asset_cache
+import cues
+import catalog
+import control
+import profiler
+from recorder import Recorder
+
+launched = time.perf_counter() # for the time to first frame, printed by main().
 
 class Settings:
 
@@ -15,19 +31,28 @@ class Settings:
     Globally accessible, placed as settings = Settings() in the __main__ method.
     '''
 
-    def __init__(self, folder, defaultres):
+    def __init__(self, folder, defaultres, decode_workers=None):
         self.resolution = defaultres
         self.path = os.path.dirname(os.path.realpath(__file__)) + "/"
         self.image_set = folder # name of current image directory
         self.img_path = self.path + "pics/" + folder + "/" # actual path of the directory
-        self.images = os.listdir(self.img_path) # list of filenames.
+        self.catalog = catalog.AssetCatalog(self.path) # every asset file, indexed once. see catalog.py.
+        self.images = self.catalog.list("pics/" + folder) # list of filenames.
         self.speed = 15
-        self.img_width, self.img_height = pygame.image.load(self.img_path + self.images[0]).get_size()
+        self.decode_workers = decode_workers # threads decoding an image set at once, None for one per CPU.
+        # the whole set is decoded here, in parallel, and uploaded by the first DisplayFrame.
+        self.preloaded = decode_images([self.img_path + image for image in self.images], self.decode_workers)
+        self.img_width, self.img_height = self.preloaded[0].get_size()
         self.x = math.ceil(self.resolution[0] / self.img_width) # number of tiles.
         self.y = math.ceil(self.resolution[1] / self.img_height)
         self.center = self.get_center()
-        self.fps = 144 # set to whatever. most settings are independent of it.
+        self.fps = 144 # set to whatever. timing is independent of it, see sub_effects.TICK.
         self.rng_factor = (self.fps * self.speed) // 10 # how often images switch randomly.
+        self.texture_budget = 512 # MB of textures kept by asset_cache before evicting old ones.
+        self.resize_delay = 0.15 # seconds without VIDEORESIZE events before the resize is applied.
+        self.max_dt = 0.1 # seconds a frame may move things by, however long it took.
+        self.profile_csv = None # path to write per-frame phase timings to, see profiler.py.
+        self.fullscreen = False # at launch. F11 toggles.
         self.overlay = None
         self.next_overlay(1) # 1 means 'forward', -1 'backward'.
         self.overlay_on = False
@@ -39,31 +64,27 @@ class Settings:
         self.rng_factor = (self.fps * self.speed) // 10
 
     def next_overlay(self, direction):
-        self.overlays = os.listdir(self.path + "overlays/")
+        self.overlays = self.catalog.list("overlays")
         if len(self.overlays) > 0:
             if not self.overlay:
-                self.pygame_overlay = pygame.image.load(self.path + "overlays/" + self.overlays[0])
                 self.overlay_index = 0
             else:
                 self.overlay_index = (self.overlay_index + direction) % len(self.overlays)
-                self.pygame_overlay = pygame.image.load(self.path + "overlays/" + self.overlays[self.overlay_index])
+            self.overlay_file = self.path + "overlays/" + self.overlays[self.overlay_index] # uploaded in render_overlay.
 
-    def next_spotlight(self, direction): # carbon copy of next_overlay; combine somehow.
-        spotlights = os.listdir(self.path + "spotlights/")
-        if len(spotlights) > 0:
-            self.spotlight_index = (self.spotlight_index + direction) % len(spotlights)
-            self.spotlight.TEXTURE = pygame._sdl2.Texture.from_surface(renderer, pygame.image.load(self.path + "spotlights/" + spotlights[self.spotlight_index]))
-            self.spotlight.TEXTURE.blend_mode = 4
+    def next_spotlight(self, direction): # the spotlight has them all loaded already.
+        self.spotlight_index = (self.spotlight_index + direction) % len(self.spotlight.files)
+        self.spotlight.select(self.spotlight_index)
 
     def render_overlay(self):
-        self.overlay = pygame._sdl2.Texture.from_surface(renderer, self.pygame_overlay)
+        self.overlay = asset_cache.load_texture(self.overlay_file)
 
 class DisplayFrame:
 
     '''
     Makes up the flickering image matrix that constitutes the lowest background layer of the
-    program. give_textures() determines how quickly the images change into others in the same
-    directory.
+    program. Which image each tile shows is changed by TileGrid through a FlipScheduler, which
+    determines how quickly the images change into others in the same directory.
     '''
 
     TEXTURES = []
@@ -73,124 +94,542 @@ class DisplayFrame:
         if not DisplayFrame.TEXTURES: # first instance loads imageset.
             DisplayFrame.load_new_imageset()
 
-    def give_textures(self): # load image and draw.
-        if randint(0,settings.rng_factor) == 0: # 10 -> 1 flip/sec, 100 -> 0.01 flips/sec.
-            self.index = randint(0,len(settings.images) - 1)
+    def give_textures(self):
         return self.TEXTURES[self.index]
 
     @classmethod
     def load_new_imageset(self):
-        pygame_images = [pygame.image.load(settings.img_path + "/" + settings.images[i]) for i in range(0, len(settings.images))]
-        DisplayFrame.TEXTURES = [pygame._sdl2.Texture.from_surface(renderer, image) for image in pygame_images]
+        pygame_images = settings.preloaded or decode_images([settings.img_path + "/" + image for image in settings.images], settings.decode_workers)
+        settings.preloaded = None
+        DisplayFrame.TEXTURES = [asset_cache.upload(image) for image in pygame_images]
+
+class FlipScheduler:
+
+    '''
+    Decides which tiles flip when. Every tile flips with chance 1/(rng_factor+1) per frame at
+    settings.fps, like the old randint(0, rng_factor) == 0 check, so over the whole grid flips are a
+    random stream at a fixed rate per second. A window of it is drawn in one go into NumPy arrays
+    sorted by time, and each frame only slices off the flips that are due: the cost follows the
+    number of flips, not the number of tiles, and the rate doesn't depend on the actual frame rate.
+    '''
+
+    def __init__(self, tiles, window=1.0):
+        self.tiles = tiles
+        self.window = window # seconds scheduled per refill.
+        self.rng = numpy.random.default_rng()
+        self.time = 0
+        self.end = 0 # first moment not scheduled yet.
+        self.refill()
+
+    def refill(self): # 10 -> 1 flip/sec, 100 -> 0.01 flips/sec, per tile.
+        rate = settings.fps / (settings.rng_factor + 1) # flips per tile per second.
+        count = self.rng.poisson(self.tiles * rate * self.window)
+        self.times = numpy.sort(self.rng.uniform(self.end, self.end + self.window, count))
+        self.tile_ids = self.rng.integers(0, self.tiles, count)
+        self.images = self.rng.integers(0, len(settings.images), count)
+        self.next = 0 # first flip not handed out yet.
+        self.end += self.window
+
+    def due(self, dt): # (tile, image index) pairs flipping in the dt seconds since the last call.
+        self.time += dt
+        tiles, images = [], []
+        while True:
+            stop = int(numpy.searchsorted(self.times, self.time, side="right"))
+            tiles += self.tile_ids[self.next:stop].tolist()
+            images += self.images[self.next:stop].tolist()
+            self.next = stop
+            if self.time < self.end:
+                return zip(tiles, images)
+            self.refill()
+
+class TileGrid:
+
+    '''
+    The DisplayFrame matrix kept in its own target texture. Only tiles that flipped since the last
+    frame are redrawn into it and the finished grid goes onto the buffer as one quad, so draw calls
+    follow the flip rate instead of the tile count. Rebuild it whenever the tiling changes.
+    '''
+
+    def __init__(self, settings):
+        self.displays, self.pos = create_displays(settings)
+        self.tile_size = (settings.img_width, settings.img_height)
+        self.create_target(settings.x * settings.img_width, settings.y * settings.img_height)
+        self.scheduler = FlipScheduler(len(self.displays))
+
+    def create_target(self, width, height):
+        self.target = pygame._sdl2.Texture(renderer, (width, height), target=True)
+        self.target.blend_mode = 0 # bottom layer, copied as is.
+        self.invalidate()
+
+    # window resized: keep the tiles that are still on screen, add or drop the rest. the image set
+    # is already uploaded, so nothing is loaded. the target only grows; a larger one is just clipped.
+    def resize(self, settings):
+        old = dict(zip(self.pos, self.displays))
+        self.displays, self.pos = [], []
+        for col, row in product(range(settings.x), range(settings.y)):
+            pos = (col * self.tile_size[0], row * self.tile_size[1])
+            self.pos.append(pos)
+            self.displays.append(old[pos] if pos in old else DisplayFrame())
+        width, height = settings.x * self.tile_size[0], settings.y * self.tile_size[1]
+        if width > self.target.width or height > self.target.height:
+            self.create_target(max(width, self.target.width), max(height, self.target.height))
+        else:
+            self.dirty = {i for i, pos in enumerate(self.pos) if pos not in old}
+        self.scheduler = FlipScheduler(len(self.displays))
+
+    def invalidate(self): # redraw every tile next frame, e.g. after the GPU lost render targets.
+        self.dirty = set(range(len(self.displays)))
+
+    def update(self, dt):
+        for i, index in self.scheduler.due(dt):
+            if index != self.displays[i].index:
+                self.displays[i].index = index
+                self.dirty.add(i)
+
+    # area: the part of the screen not covered by anything opaque, None for all of it. covered
+    # tiles stay dirty until they show again.
+    def draw(self, area=None):
+        if area is None:
+            area = self.target.get_rect()
+        if self.dirty:
+            previous = renderer.target
+            renderer.target = self.target
+            renderer.draw_color = (0,0,0,255) # what the buffer used to show under transparent tiles.
+            for i in [i for i in self.dirty if area.colliderect((self.pos[i], self.tile_size))]:
+                renderer.fill_rect((*self.pos[i], *self.tile_size))
+                self.displays[i].give_textures().draw(dstrect=self.pos[i])
+                self.dirty.discard(i)
+            renderer.target = previous
+        area = area.clip(self.target.get_rect())
+        self.target.draw(srcrect=area, dstrect=area)
+
+class ImagesetPrefetcher:
+
+    '''
+    Decodes the next directory of settings.directory_list on a worker thread while the current one
+    plays. pump() runs once per frame on the render thread and uploads decoded images within a small
+    time budget, so by the time D is pressed the whole set is usually on the GPU already and the
+    switch is a list swap. Textures can only be made on the render thread, hence the split.
+    '''
+
+    def __init__(self, upload_budget=0.002):
+        self.upload_budget = upload_budget # seconds per frame spent uploading.
+        self.generation = 0 # bumped on every start() so stale workers stop early.
+        self.image_set = None
+
+    def start(self, image_set):
+        self.generation += 1
+        self.image_set = image_set
+        self.images = []
+        self.textures = []
+        self.decoded = queue.Queue() # Surface per image, then None when finished (False on failure).
+        self.finished = False
+        self.failed = False
+        path = settings.path + "pics/" + image_set + "/"
+        threading.Thread(target=self.decode, args=(self.generation, path, self.decoded), daemon=True).start()
+
+    def decode(self, generation, path, decoded):
+        try:
+            for filename in os.listdir(path):
+                if generation != self.generation:
+                    return
+                decoded.put((filename, asset_cache.load_surface(path + filename)))
+            decoded.put(None)
+        except Exception as e:
+            print(f"Prefetching {path} failed: {e}.")
+            decoded.put(False)
+
+    def pump(self, block=False): # upload what the worker has decoded so far.
+        deadline = time.perf_counter() + self.upload_budget
+        while self.image_set and not self.finished and (block or time.perf_counter() < deadline):
+            try:
+                item = self.decoded.get(block=block)
+            except queue.Empty:
+                return
+            if not item:
+                self.finished = True
+                self.failed = item is False or not self.textures
+                return
+            self.images.append(item[0])
+            self.textures.append(asset_cache.upload(item[1]))
+
+    def take(self, image_set): # (filenames, textures) of image_set, or None if it wasn't prefetched.
+        if image_set != self.image_set:
+            return None
+        self.pump(block=True) # only waits if D is pressed before the worker is done.
+        self.image_set = None
+        return None if self.failed else (self.images, self.textures)
+
+class SceneLoader:
+
+    '''
+    The numbered scenes in effects/ (001.png, 002.png, ...), registered by file name only. focus()
+    has a worker thread decode the current scene and `keep` neighbours either side, pump() turns
+    them into Sprites on the render thread, and scenes outside that window are released once they
+    have faded out. Startup time and texture memory no longer grow with the number of scenes.
+    Indexing a scene that isn't loaded yet loads it on the spot.
+    '''
+
+    def __init__(self, files, keep=1, upload_budget=0.002):
+        self.files = files # scene file names, in order.
+        self.keep = keep
+        self.upload_budget = upload_budget # seconds per frame spent uploading.
+        self.sprites = {} # index: Sprite, for the loaded scenes.
+        self.pending = set() # indices queued for decoding.
+        self.index = 0
+        self.requests = queue.Queue()
+        self.decoded = queue.Queue() # (index, Surface, opaque), Surface is None if decoding failed.
+        threading.Thread(target=self.decode, daemon=True).start()
+
+    def __len__(self):
+        return len(self.files)
+
+    def __getitem__(self, index):
+        if index not in self.sprites:
+            self.sprites[index] = self.make(index)
+        return self.sprites[index]
+
+    def make(self, index):
+        return sub_effects.Sprite(self.files[index], initial_scale=2, fade_speed=2)
+
+    def loaded(self): # in scene order, so later scenes draw on top.
+        return [self.sprites[i] for i in sorted(self.sprites)]
+
+    def window(self):
+        if not self.files:
+            return set()
+        return {(self.index + d) % len(self.files) for d in range(-self.keep, self.keep + 1)}
+
+    def focus(self, index):
+        self.index = index
+        for i in self.window() - self.sprites.keys() - self.pending:
+            self.pending.add(i)
+            self.requests.put(i)
+
+    def decode(self): # worker thread.
+        while True:
+            i = self.requests.get()
+            try:
+                surface = asset_cache.load_surface(sub_effects.effects + self.files[i])
+                self.decoded.put((i, surface, asset_cache.opaque(surface)))
+            except Exception as e:
+                print(f"Loading scene {self.files[i]} failed: {e}.")
+                self.decoded.put((i, None, False))
+
+    def pump(self):
+        deadline = time.perf_counter() + self.upload_budget
+        while not self.decoded.empty() and time.perf_counter() < deadline:
+            i, surface, is_opaque = self.decoded.get()
+            self.pending.discard(i)
+            if surface and i not in self.sprites and i in self.window():
+                asset_cache.cache.add(sub_effects.effects + self.files[i], surface, is_opaque=is_opaque)
+                self.sprites[i] = self.make(i)
+        window = self.window()
+        for i in [i for i, sprite in self.sprites.items() if i not in window and sprite.opacity == 0]:
+            del self.sprites[i]
+            asset_cache.cache.invalidate(sub_effects.effects + self.files[i]) # frees the texture.
 
 class Text:
 
     '''
     A single Text instance is needed to display the subtitles. Fade animations and scaling are
-    done by update_font_size and some if blocks in the main function. load_surfaces should be
-    rewritten later.
+    done by update_font_size and some if blocks in the main function. The next `ahead` lines of
+    the dialogue file are rendered ahead of time on a worker thread (prerender) and uploaded by
+    pump(), so next_message is normally just a dictionary lookup. Lines behind are dropped again,
+    so a long script holds only a few dozen textures.
     '''
 
+    FONTS = {} # (family, size): Font. built once per size for the whole session.
+    WIDTHS = {} # (family, size, line): rendered width in pixels.
+    BOX = None # 1x1 black Texture, stretched under every line.
+
     def __init__(self):
         self.colour = (255,255,255)
         self.text_alpha = 0
         self.box_alpha = 0
         self.max_alpha = 225 # max alpha for the box under text.
+        self.font_lock = threading.Lock() # SDL_ttf work happens on one thread at a time.
+        self.index = 0 # current line number in directory.txt.
+        self.ahead = 30 # lines kept rendered after the current one.
         self.update_font_size()
         self.read_messages()
-        self.index = 0 # current line number in directory.txt.
         self.next_message()
         self.texts = {} # Texture: Rect
-        self.boxes = {} # Texture: Rect
+        self.boxes = [] # Rects, drawn with BOX.
         self.speaker_height = 120
 
     def update_font_size(self): # linear function: font_size is 40 at width 1500, 60 at 2000.
         self.font_size = (screen.size[0] - 500) // 25
-        
-    # creates a bunch of temporary Surfaces that are then rendered into Texture and Rect objects.
+
+    # fetches the Textures and Rects of the current message, rendering it here if the prerender
+    # thread hasn't got to it yet.
     def load_surfaces(self):
         if not self.message:
             return
         self.update_font_size()
-        self.font = pygame.font.SysFont("courier", self.font_size) # first reset font at desired size (default 40).
-        x, y = settings.get_center()
-        self.set_subtitle_size(max(self.message, key=lambda x: len(x))) # based on the longer segment.
-        text_surf = self.font.render(self.message[-1], True, self.colour)
-        text_box = pygame.Surface((text_surf.get_width() + 20, text_surf.get_height() + 20))
-        text_box.set_colorkey((1,2,3)) # Texture.alpha needs a colorkey to work properly.
-        text_surfs = [text_surf]
-        box_surfs = [text_box]
-        text_rects = [text_surf.get_rect(center=(x,y))]
-        box_rects = [text_box.get_rect(center=(x,y))]
-        if len(self.message) > 1: # then the speaker line.
-            speaker_surf = self.font.render("(" + self.message[0] + ")", True, (255,255,255))
-            speaker_box = pygame.Surface((speaker_surf.get_width() + 20, speaker_surf.get_height() + 20))
-            speaker_box.set_colorkey((1,2,3))
-            text_surfs.append(speaker_surf)
-            box_surfs.append(speaker_box)
-            self.speaker_height = box_surfs[1].get_height()*1.3 # rough placement, 1.3 is arbitrary.
-            text_rects.append(speaker_surf.get_rect(center=(x,y-self.speaker_height)))
-            box_rects.append(speaker_box.get_rect(center=(x,y-self.speaker_height)))
-        self.texts = {pygame._sdl2.Texture.from_surface(renderer, text_surf): text_rect for text_surf, text_rect in zip(text_surfs, text_rects)}
-        self.boxes = {pygame._sdl2.Texture.from_surface(renderer, box_surf): box_rect for box_surf, box_rect in zip(box_surfs, box_rects)}
+        key = ("#".join(self.message), self.font_size, tuple(settings.resolution))
+        if key not in self.prerendered:
+            self.prerendered[key] = self.upload(*self.render_line(self.message, self.font_size, settings.resolution))
+            self.requested.add(key)
+        self.texts, self.boxes = self.prerendered[key]
+
+    # creates the text Surfaces of one message with their Rects, and the Rects of the boxes under
+    # them. also runs on the prerender thread, so it only reads its arguments.
+    def render_line(self, message, font_size, resolution):
+        with self.font_lock:
+            x, y = resolution[0] // 2, resolution[1] // 2
+            font = self.set_subtitle_size(max(message, key=lambda x: len(x)), font_size, resolution[0]) # based on the longer segment.
+            text_surf = font.render(message[-1], True, self.colour)
+            texts = [(text_surf, text_surf.get_rect(center=(x,y)))]
+            boxes = [text_surf.get_rect(center=(x,y)).inflate(20, 20)]
+            if len(message) > 1: # then the speaker line.
+                speaker_surf = font.render("(" + message[0] + ")", True, (255,255,255))
+                speaker_height = (speaker_surf.get_height() + 20)*1.3 # rough placement, 1.3 is arbitrary.
+                texts.append((speaker_surf, speaker_surf.get_rect(center=(x,y-speaker_height))))
+                boxes.append(speaker_surf.get_rect(center=(x,y-speaker_height)).inflate(20, 20))
+        return texts, boxes
+
+    def upload(self, texts, boxes): # render thread only.
+        if Text.BOX is None:
+            box = pygame.Surface((1, 1), pygame.SRCALPHA, 32) # per-pixel alpha, so Texture.alpha fades it.
+            box.fill((0, 0, 0, 255))
+            Text.BOX = asset_cache.upload(box)
+        return {asset_cache.upload(surf): rect for surf, rect in texts}, boxes
 
     def give_textures(self):
         return self.texts, self.boxes
         
-    def read_messages(self): # find dirname.txt or create one if missing.
+    def read_messages(self, render=True): # find dirname.txt or create one if missing. render=False: don't prerender yet.
         filename = settings.path + "pics/" + settings.image_set + ".txt"
         if os.path.isfile(filename):
             with open(filename) as f:
                 self.messages = f.readlines()
         else:
             open(settings.path + "pics/" + settings.image_set + ".txt", "a").close() # create missing file.
-
-    def next_message(self): # load current index message, generate text surfaces and rects, then iterate index.
+            self.messages = []
+        if render:
+            self.prerender()
+
+    # drops every rendered line and starts rendering again for the current font size and
+    # resolution, from the current line. call after reading messages or resizing.
+    def prerender(self):
+        if hasattr(self, "requests"):
+            self.requests.put(None) # stops the previous worker.
+        self.prerendered = {} # (line, font size, resolution): ({Texture: Rect}, [Rect])
+        self.requested = set() # keys asked of the worker or already rendered.
+        self.requests = queue.Queue() # keys for the worker to render.
+        self.rendered = queue.Queue() # (key, (texts, boxes)) from the worker, waiting for pump().
+        threading.Thread(target=self.prerender_lines, args=(self.requests, self.rendered), daemon=True).start()
+        self.refill()
+
+    def prerender_lines(self, requests, rendered):
+        while key := requests.get():
+            rendered.put((key, self.render_line(key[0].split("#"), key[1], key[2])))
+
+    # keeps the lines from the one shown to `ahead` after it: asks the worker for the missing ones
+    # and drops the rest.
+    def refill(self):
+        if not self.messages:
+            return
+        count = min(self.ahead + 2, len(self.messages))
+        lines = [self.messages[(self.index - 1 + i) % len(self.messages)].strip() for i in range(count)]
+        window = [(line, self.font_size, tuple(settings.resolution)) for line in dict.fromkeys(lines) if line]
+        for key in self.requested - set(window):
+            self.requested.discard(key)
+            self.prerendered.pop(key, None)
+        for key in window:
+            if key not in self.requested:
+                self.requested.add(key)
+                self.requests.put(key)
+
+    def pump(self, upload_budget=0.002): # upload finished lines for up to upload_budget seconds.
+        deadline = time.perf_counter() + upload_budget
+        while time.perf_counter() < deadline:
+            try:
+                key, surfaces = self.rendered.get_nowait()
+            except queue.Empty:
+                return
+            if key in self.requested and key not in self.prerendered: # not dropped meanwhile.
+                self.prerendered[key] = self.upload(*surfaces)
+
+    # load current index message, generate text surfaces and rects, then iterate index. load=False
+    # only moves on, for skipping through many lines at once; call load_surfaces() and refill() after.
+    def next_message(self, load=True):
         if not self.messages:
             self.message = None
         else:
             self.message = self.messages[self.index].strip().split("#")
-            self.load_surfaces()
+            if load:
+                self.load_surfaces()
             self.index = (self.index + 1) % len(self.messages)
+            if load:
+                self.refill()
 
-    def set_subtitle_size(self, line: str): # automatic adjustment of each subtitle line to window width.
-        w = self.font.size(line)[0]
-        while w > settings.resolution[0]: # while text overshoots window frame.
-            w = self.font.size(line)[0]
-            self.font_size -= 1
-            self.font = pygame.font.SysFont("courier", self.font_size)
+    @classmethod
+    def get_font(self, size, family="courier"): # SysFont does a system font lookup, so keep them.
+        if (family, size) not in Text.FONTS:
+            Text.FONTS[(family, size)] = pygame.font.SysFont(family, size)
+        return Text.FONTS[(family, size)]
+
+    @classmethod
+    def measure(self, line, size, family="courier"):
+        if (family, size, line) not in Text.WIDTHS:
+            Text.WIDTHS[(family, size, line)] = self.get_font(size, family).size(line)[0]
+        return Text.WIDTHS[(family, size, line)]
+
+    # automatic adjustment of each subtitle line to window width: the largest size up to font_size
+    # that fits, found by binary search since width grows with size.
+    def set_subtitle_size(self, line: str, font_size, width):
+        if self.measure(line, font_size) <= width:
+            return self.get_font(font_size)
+        low, high = 1, font_size - 1
+        while low < high:
+            mid = (low + high + 1) // 2
+            if self.measure(line, mid) <= width:
+                low = mid
+            else:
+                high = mid - 1
+        return self.get_font(low)
 
     def purge_data(self):
         if self.message:
-            self.texts.clear()
-            self.boxes.clear()
+            self.texts, self.boxes = {}, [] # the originals belong to self.prerendered.
 
-def load_next_directory(text, settings):
+def next_image_set(settings):
+    return settings.directory_list[(settings.current_index + 1) % len(settings.directory_list)]
+
+def load_next_directory(text, settings, prefetcher):
     text.purge_data()
+    load_directory(settings, prefetcher, 1)
+    text.index = 0
+    text.read_messages()
+    text.text_alpha = 0
+    text.box_alpha = 0
+
+# the images of the directory step places on from the current one (0: the current one itself), or
+# of the next one that loads if it fails. starts prefetching the directory after it.
+def load_directory(settings, prefetcher, step):
     while True:
-        settings.current_index = (settings.current_index + 1) % len(settings.directory_list)
+        settings.current_index = (settings.current_index + step) % len(settings.directory_list)
+        step = 1
+        prefetched = prefetcher.take(settings.directory_list[settings.current_index])
         try: # new directory and image data.
             settings.image_set = settings.directory_list[settings.current_index]
-            settings.images = os.listdir(settings.path + "pics/" + settings.image_set)
             settings.img_path = settings.path + "pics/" + settings.image_set
-            settings.img_width, settings.img_height = pygame.image.load(settings.img_path + "/" + settings.images[0]).get_size()
+            if prefetched:
+                settings.images, DisplayFrame.TEXTURES = prefetched
+                settings.img_width, settings.img_height = DisplayFrame.TEXTURES[0].width, DisplayFrame.TEXTURES[0].height
+            else: # not prefetched (or it failed): decode here, on the render thread.
+                settings.images = settings.catalog.list("pics/" + settings.image_set)
+                settings.preloaded = decode_images([settings.img_path + "/" + image for image in settings.images], settings.decode_workers)
+                settings.img_width, settings.img_height = settings.preloaded[0].get_size()
+                DisplayFrame.load_new_imageset()
             settings.x = math.ceil(screen.size[0] / settings.img_width) 
             settings.y = math.ceil(screen.size[1] / settings.img_height)
             break
         except:
             continue
-    text.read_messages()
-    text.index = 0
-    text.text_alpha = 0
-    text.box_alpha = 0
+    prefetcher.start(next_image_set(settings))
     
+def decode_images(paths, workers=None): # Surfaces in the order of paths, decoded across a thread pool.
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(asset_cache.load_surface, paths))
+
 def create_displays(settings): # tiling via x-tile * y-tile DisplayFrame objects.
-    displays = [DisplayFrame() for x in range(settings.x * settings.y)]
-    DisplayFrame.load_new_imageset()
+    displays = [DisplayFrame() for x in range(settings.x * settings.y)] # first one loads the imageset if needed.
     offset = product([x for x in range(settings.x)], [x for x in range(settings.y)])
     pos = [(0 + off[0] * settings.img_width, 0 + off[1] * settings.img_height) for off in offset]
     return displays, pos
 
+# applied once the window has stopped changing size for settings.resize_delay seconds. The grid,
+# text and stars are adapted in place; the buffer is only replaced when the window outgrows it.
+def apply_resize(settings, grid, text, effects, buffer):
+    settings.resolution = screen.size
+    settings.center = settings.get_center()
+    settings.x = math.ceil(screen.size[0] / settings.img_width)
+    settings.y = math.ceil(screen.size[1] / settings.img_height)
+    grid.resize(settings)
+    if settings.resolution[0] > buffer.width or settings.resolution[1] > buffer.height:
+        buffer = pygame._sdl2.Texture(renderer, (max(settings.resolution[0], buffer.width), max(settings.resolution[1], buffer.height)), target=True)
+        buffer.blend_mode = 1
+    for ef in effects:
+        for component in (ef if type(ef) == list else [ef]):
+            if hasattr(component, "rescale"):
+                component.rescale(settings.resolution)
+    text.update_font_size()
+    text.prerender() # every line has to be re-fitted for the new width.
+    text.load_surfaces()
+    print("Current resolution: %s x %s" %(settings.resolution))
+    return buffer
+
+# reload just the files the catalog saw change. effects and scenes check for their own files.
+def hot_reload(changes, settings, grid, text, effects, prefetcher):
+    for kind, name in changes:
+        path = settings.path + name
+        asset_cache.cache.invalidate(path)
+        folder, rest = name.split("/", 1)
+        try:
+            if folder == "overlays":
+                if settings.overlay and path == settings.overlay_file and kind != "removed":
+                    settings.render_overlay()
+            elif folder == "spotlights":
+                settings.spotlight.reload(path, kind)
+                settings.spotlight_index = settings.spotlight.index
+            elif folder == "pics":
+                if rest == settings.image_set + ".txt":
+                    text.read_messages() # keeps the position, like T.
+                elif os.path.dirname(rest) == settings.image_set and kind != "removed":
+                    image = os.path.basename(rest)
+                    texture = asset_cache.upload(asset_cache.load_surface(path))
+                    if image in settings.images:
+                        DisplayFrame.TEXTURES[settings.images.index(image)] = texture
+                    else:
+                        settings.images.append(image)
+                        DisplayFrame.TEXTURES.append(texture)
+                    grid.invalidate()
+                elif os.path.dirname(rest) == prefetcher.image_set: # decode the next set again.
+                    prefetcher.start(prefetcher.image_set)
+            else:
+                for ef in effects:
+                    for component in ef if type(ef) == list else [ef]:
+                        if hasattr(component, "reload"):
+                            component.reload(path, kind)
+        except (pygame.error, OSError, ValueError) as e: # e.g. saved again while loading.
+            print(f"Could not reload {name}: {e}.")
+            settings.catalog.forget(name) # try again on the next poll.
+            continue
+        print(f"Reloaded {name} ({kind}).")
+
+def quit_show(timings, remote, recorder): # reports, then exit.
+    print(asset_cache.cache.report())
+    if asset_cache.pixel_cache:
+        print(asset_cache.pixel_cache.report())
+    if remote:
+        print(remote.report())
+    if recorder: # finishes writing what is queued.
+        recorder.close()
+        print(recorder.report())
+    timings.close()
+    exit()
+
+def draw_effect(ef, dt, area): # updates ef and draws it if it shows on area.
+    if hasattr(ef, "draw"): # draws itself, in more than one piece.
+        ef.draw(dt) if area else ef.update(dt)
+    else:
+        drawn = ef.update(dt)
+        if shows(drawn, area):
+            ef.TEXTURE.draw(**drawn)
+
+def shows(drawn, area): # would a draw with these update() arguments land on the uncovered area?
+    if not area:
+        return False
+    if len(drawn["dstrect"]) == 2: # a position: drawn at full size, assume it does.
+        return True
+    rect = pygame.Rect(drawn["dstrect"])
+    if drawn.get("angle"): # room for the corners of a rotated image.
+        rect.inflate_ip(rect.h, rect.w)
+    return area.colliderect(rect)
+
 # sub_effects effects are stored in a list called 'effects' in main(): each cell is toggled via 1-9.
 # This function enables a cell to be a list of effects rather than a single effect, such as 
 # 100 sprites at once. This is why there are if type(effect) == list checks inside main().
@@ -201,7 +640,16 @@ def toggle_effects(effects):
         for ef in effects:
             ef.toggle()
 
-def main(settings, screen, renderer): # TODO: redesign fades.
+def finish_fades(layers): # every fade in layers (effects, or lists of them) jumps to its end.
+    for layer in layers:
+        for ef in layer if type(layer) == list else [layer]:
+            ef.opacity = 255 if ef.fade_speed > 0 else 0
+
+# sink: if given, main() renders offline: every finished frame is read back from the buffer and
+# passed to sink(surface) instead of being presented, without frame pacing (see offline_render.py).
+# frames > 0 returns after that many frames. timeline: a cues.CueTimeline fired against the show clock.
+# recorder: a recorder.Recorder, given every live frame before it is presented.
+def main(settings, screen, renderer, sink=None, frames=0, timeline=None, remote=None, recorder=None): # TODO: redesign fades.
 
     # pygame components, including SDL2 rendering.
     clock = pygame.time.Clock()
@@ -212,6 +660,9 @@ def main(settings, screen, renderer): # TODO: redesign fades.
     sub_effects.renderer = renderer
     sub_effects.settings = settings
     sub_effects.screen = screen
+    asset_cache.renderer = renderer
+    asset_cache.cache.budget = settings.texture_budget * 1024 * 1024
+    profiler.renderer = renderer
 
     # EFFECTS SECTION - controls 1-9.
     # Each entry can be either a sub_effects class instance or a *list* of such instances. You can toggle each
@@ -236,75 +687,133 @@ sub_effects.Animation("frontfist", frametime=18, pos=(500, 250), scale=0.4)
     # Call mover classes from movers.py here and invoke them on specific entries of effects[].
     movers = [automatic_movers.Mover1(effects[4])]
 
-    settings.spotlight = sub_effects.Spotlight(os.listdir(settings.path + "spotlights/")[0], settings.resolution)
-    settings.spotlight_index = 0
+    settings.spotlight = sub_effects.Spotlight(settings.catalog.list("spotlights")[0], settings.resolution)
+    settings.spotlight_index = settings.spotlight.index
 
     # SCENES - press PGDN, PGUP to cycle through. basically, use Sprite or Animation.
     # pos=(0,0), initial_scale=2; make 960 x 540 image for 1920x1080.
     # SCENES are image files in /effects titled 001.png, 002.png, ..., 027.png etc.
-    scene_files = os.listdir(os.path.dirname(os.path.realpath(__file__)) + "/effects/")
-    largest_num = 0
-    for filename in scene_files:
-        if filename[:-4].isnumeric():
-            largest_num = max(largest_num, int(filename[:-4]))
-    scenes = [sub_effects.Sprite(str(i).zfill(3) + ".png", initial_scale=2, fade_speed=2) for i in range(1,largest_num+1)]
+    scene_files = [filename for filename in settings.catalog.list("effects") if filename[:-4].isnumeric()]
+    scenes = SceneLoader(sorted(scene_files, key=lambda filename: int(filename[:-4]))) # loaded around scene_index only.
     scene_index = 0
+    if scenes:
+        scenes.focus(scene_index)
 
     # rest of the generic settings
-    displays, pos = create_displays(settings)
+    grid = TileGrid(settings)
+    prefetcher = ImagesetPrefetcher()
+    prefetcher.start(next_image_set(settings))
+    if not sink: # live: pick up files saved during rehearsal. offline renders stay reproducible.
+        settings.catalog.start()
     text = Text()
     text.index = 0
     text_show = False
-    fade_time = 0 # this acts as both a boolean and counter.
-    fade_duration = settings.fps // 5 # 1/x seconds.
+    fade_time = 0 # seconds of text fade left. this acts as both a boolean and counter.
+    fade_duration = 0.2 # seconds.
     control_index = 0
-    fullscreen_toggle = False # no 'screen.is_fullscreen' in SDL2, need this.
+    fullscreen_toggle = settings.fullscreen # no 'screen.is_fullscreen' in SDL2, need this.
+    resize_due = 0 # time at which a pending window resize gets applied, 0 if none.
+    frame = 0
+    elapsed = 0 # show clock in seconds: wall time live, frame / fps offline.
+    timings = profiler.FrameProfiler(settings.profile_csv) # HUD with F3.
+    last_frame = time.perf_counter()
 
     while True:
 
+        # everything moves by dt, the seconds since the previous frame, so timing doesn't depend
+        # on the frame rate. offline every frame is exactly 1/fps. after a stall (a directory loaded
+        # on the spot, a hot reload) dt is capped at max_dt, so fades, motion, particles and tile
+        # flips pick up where they were instead of jumping; the show clock for cues isn't capped.
+        if sink:
+            dt = 1 / settings.fps
+            elapsed += dt
+        else:
+            now = time.perf_counter()
+            dt, last_frame = now - last_frame, now
+            elapsed += dt
+            dt = min(dt, settings.max_dt)
+
         renderer.target = buffer
         renderer.clear()
 
         # MOVER CLASSES.
-        # Here we first call all the movers to move.
-        for mover in movers:
-            mover.move()
+        # Here we first move everything the movers (and ArcSprite, SweepSprite) attached to the motion engine.
+        motion.engine.step(dt)
+        timings.mark("movers")
+
+        # OCCLUSION
+        # What is left of the screen for each layer once the ones above it are drawn: the spotlight
+        # cover leaves only its opening, an opaque scene that is fully up hides everything under it.
+        # Hidden layers still update, they just aren't drawn.
+        uncovered = pygame.Rect((0,0), settings.resolution)
+        opening = settings.spotlight.opening()
+        if opening:
+            uncovered = uncovered.clip(opening)
+        shown = scenes.loaded()
+        scene_areas = []
+        for scene in shown[::-1]: # top first.
+            scene_areas.append(uncovered)
+            cover = scene.covers() if scene.opacity > 0 else None
+            if cover and cover.contains(uncovered):
+                uncovered = pygame.Rect(0,0,0,0)
+        scene_areas.reverse()
 
         # DRAWING SECTION
         # Flickering bottom layer images from a directory in /pics. Must be placed first because 100% opaque.
-        for i, display in enumerate(displays):
-            display.give_textures().draw(dstrect=pos[i])
+        grid.update(dt)
+        if uncovered:
+            grid.draw(uncovered)
+        timings.mark("tiles")
 
         # Draw overlay with transparency. needs alpha layer or will cover panels.
-        if settings.overlay_on:
-            settings.overlay.draw(dstrect=(0,0))
+        if settings.overlay_on and uncovered:
+            area = uncovered.clip(settings.overlay.get_rect())
+            settings.overlay.draw(srcrect=area, dstrect=area)
+        timings.mark("overlay")
 
         # If the effect cell is a list, iterate and draw, otherwise draw.
         for ef in effects:
             if type(ef) == list:
                 if ef[0].opacity > 0:
                     for component in ef:
-                        component.TEXTURE.draw(**component.update())
+                        draw_effect(component, dt, uncovered)
             elif ef.opacity > 0:
-                ef.TEXTURE.draw(**ef.update())
+                draw_effect(ef, dt, uncovered)
+        timings.mark("effects")
 
-        for scene in scenes:
+        for scene, area in zip(shown, scene_areas):
             if scene.opacity > 0:
-                scene.TEXTURE.draw(**scene.update())
+                drawn = scene.update(dt)
+                if shows(drawn, area):
+                    scene.TEXTURE.draw(**drawn)
+        timings.mark("scenes")
 
         if settings.spotlight.opacity > 0:
-            settings.spotlight.draw()
+            settings.spotlight.draw(dt)
+        timings.mark("spotlight")
 
         # Text boxes are drawn last so that they are always visible.
         if text.text_alpha > 0 and text.message:
+            Text.BOX.alpha = int(text.box_alpha)
             for box in text.boxes:
-                box.alpha = text.box_alpha
-                box.draw(dstrect=text.boxes[box].topleft)
+                Text.BOX.draw(dstrect=box)
             for txt in text.texts:
-                txt.alpha = text.text_alpha
+                txt.alpha = int(text.text_alpha)
                 txt.draw(dstrect=text.texts[txt].topleft)
+        timings.mark("text")
 
         # EVENT HANDLING SECTION
+        # Cues are posted as the key presses they stand for and handled below like the real thing.
+        catching_up = timeline and timeline.catching_up() # replaying the cues before --seek.
+        directory_due = False # catching up: only the directory and scenes the cues end on get loaded.
+        scenes_toggled = set() # catching up: scenes toggled an odd number of times.
+        if timeline:
+            for event in timeline.due(elapsed):
+                pygame.event.post(event)
+        if remote: # and so are commands from the control server.
+            for event in remote.due():
+                pygame.event.post(event)
+
         for e in pygame.event.get():
 
             # uncomment if using.
@@ -320,32 +829,38 @@ sub_effects.Animation("frontfist", frametime=18, pos=(500, 250), scale=0.4)
             if e.type == pygame.KEYDOWN:
 
                 if e.key == pygame.K_ESCAPE:
-                    exit()
+                    quit_show(timings, remote, recorder)
 
                 # show next text line / hide current one
                 elif e.key in (pygame.K_z, pygame.K_x, pygame.K_c):
                     if not text_show:
                         text.text_alpha = 0
                         text.box_alpha = 0
-                        text.next_message()
+                        text.next_message(not catching_up)
                     text_show ^= True
-                    fade_time = 1 # access fades.
+                    fade_time = fade_duration # access fades.
                 
                 # If you have large background images in 
                 elif e.key in (pygame.K_RIGHT, pygame.K_LEFT):
                     if not scenes:
                         print("There are no scenes set up.")
-                        break
-                    if scenes[scene_index].opacity > 0:
+                        continue # with the next event; the others this frame still count.
+                    if catching_up: # the same toggles, counted instead of loading every scene on the way.
+                        scenes_toggled.discard(scene_index)
+                    elif scenes[scene_index].opacity > 0:
                         scenes[scene_index].toggle()
                     if e.key == pygame.K_RIGHT:
                         scene_index = (scene_index + 1) % len(scenes)
                     else:
                         scene_index = (scene_index - 1) % len(scenes)
+                    if catching_up:
+                        scenes_toggled ^= {scene_index}
+                        continue
                     scenes[scene_index].toggle()
+                    scenes.focus(scene_index)
 
                 elif e.key == pygame.K_t: # reload current text file. retain position.
-                    text.read_messages()
+                    text.read_messages(not catching_up)
                     print("Reloaded dialogue file.")
 
                 elif e.key == pygame.K_r: # reset positions of effects.
@@ -359,8 +874,15 @@ sub_effects.Animation("frontfist", frametime=18, pos=(500, 250), scale=0.4)
                         mover.reset()
 
                 elif e.key == pygame.K_d: # switch directory.
-                    load_next_directory(text, settings)
-                    displays, pos = create_displays(settings)
+                    if catching_up: # only move on, with the text; the images are loaded once caught up.
+                        settings.current_index = (settings.current_index + 1) % len(settings.directory_list)
+                        settings.image_set = settings.directory_list[settings.current_index]
+                        text.index = 0
+                        text.read_messages(False)
+                        directory_due = True
+                    else:
+                        load_next_directory(text, settings, prefetcher)
+                        grid = TileGrid(settings)
                     text_show = False
 
                 elif e.key == pygame.K_b: # toggle overlay
@@ -381,9 +903,9 @@ sub_effects.Animation("frontfist", frametime=18, pos=(500, 250), scale=0.4)
                     if not text_show:
                         text.text_alpha = 0
                         text.box_alpha = 0
-                        text.next_message()
+                        text.next_message(not catching_up)
                     text_show ^= True
-                    fade_time = 1 # access fades
+                    fade_time = fade_duration # access fades
 
                 # effect toggling. 1 to 9. 1 corresponds to 49.
                 elif e.key in {x+49 for x in range(0,10)} and effects:
@@ -409,6 +931,9 @@ sub_effects.Animation("frontfist", frametime=18, pos=(500, 250), scale=0.4)
                             break
                     print(f"current control key: {control_index + 1}") # which button to press to enable this one.
 
+                elif e.key == pygame.K_F3: # frame timing overlay.
+                    timings.toggle_hud()
+
                 # toggle fullscreen on/off. clumsy due to lacking SDL2 functionality.
                 elif e.key == pygame.K_F11:
                     fullscreen_toggle ^= True
@@ -417,29 +942,46 @@ sub_effects.Animation("frontfist", frametime=18, pos=(500, 250), scale=0.4)
                     else:
                         screen.set_windowed()
 
-            # recomputing various screensize aspects after resize
+            # dragging the window edge sends dozens of these: wait for it to settle.
             elif e.type == pygame.VIDEORESIZE:
-                settings.x = math.ceil(screen.size[0] / settings.img_width)
-                settings.y = math.ceil(screen.size[1] / settings.img_height)
-                displays, pos = create_displays(settings)
-                settings.resolution = screen.size
-                buffer = pygame._sdl2.Texture(renderer, settings.resolution, target=True)
-                text.update_font_size()
-                print("Current resolution: %s x %s" %(settings.resolution))
+                resize_due = time.perf_counter() + settings.resize_delay
+
+            elif e.type in (pygame.RENDER_TARGETS_RESET, pygame.RENDER_DEVICE_RESET):
+                grid.invalidate()
+                settings.spotlight.invalidate()
 
             elif e.type == pygame.QUIT:
-                exit()
+                quit_show(timings, remote, recorder)
+
+        if catching_up: # land in the state the cues leave, without watching them fade there.
+            if directory_due:
+                load_directory(settings, prefetcher, 0)
+                grid = TileGrid(settings)
+            for index in scenes_toggled:
+                scenes[index].toggle()
+            if scenes:
+                scenes.focus(scene_index)
+            finish_fades(effects + scenes.loaded() + [settings.spotlight])
+            text.load_surfaces() # only the line the cues end on.
+            text.refill()
+            if fade_time:
+                fade_time = 0
+                text.text_alpha = 255 if text_show else 0
+                text.box_alpha = text.max_alpha if text_show else 0
+
+        # recomputing various screensize aspects after resize
+        if resize_due and time.perf_counter() >= resize_due:
+            resize_due = 0
+            buffer = apply_resize(settings, grid, text, effects, buffer)
+        timings.mark("events")
 
         # FADES FOR TEXT AND BOXES. (TODO: build into classes.)
-        if fade_time > 0 and text_show: # fade in
-            fade_time += 1
-            text.text_alpha += 255 // fade_duration
-            text.box_alpha += text.max_alpha // fade_duration
-        elif fade_time > 0 and not text_show: # fade out
-            fade_time += 1
-            text.text_alpha -= 255 // fade_duration
-            text.box_alpha -= text.max_alpha // fade_duration
-        if fade_time > fade_duration: # fade has finished.
+        if fade_time > 0: # fade in or out, by the share of fade_duration that dt covers.
+            fade_time -= dt
+            step = dt / fade_duration if text_show else -dt / fade_duration
+            text.text_alpha = min(255, max(0, text.text_alpha + 255 * step))
+            text.box_alpha = min(text.max_alpha, max(0, text.box_alpha + text.max_alpha * step))
+        if fade_time < 0: # fade has finished.
             fade_time = 0
 
         # RESIZING CONTROL SECTION
@@ -463,16 +1005,49 @@ sub_effects.Animation("frontfist", frametime=18, pos=(500, 250), scale=0.4)
         if effects:
             ef = effects[control_index]
             if hasattr(ef, "move"):
-                ef.move(direction)
+                ef.move(direction, dt)
             if settings.spotlight.opacity > 0: # takes precedent over sprites.
-                settings.spotlight.resize(resize_factor)
+                settings.spotlight.resize(resize_factor, dt)
             elif hasattr(ef, "resize"):
-                ef.resize(resize_factor)
+                ef.resize(resize_factor, dt)
+        timings.mark("controls")
                 
-        renderer.target = None
-        buffer.draw()
-        renderer.present() 
-        clock.tick(settings.fps)
+        prefetcher.pump() # upload a slice of the next directory.
+        text.pump() # and of the prerendered subtitle lines.
+        scenes.pump() # and of the scenes next to the current one.
+        changes = settings.catalog.changes() # files saved since the last frame.
+        if changes:
+            hot_reload(changes, settings, grid, text, effects + scenes.loaded(), prefetcher)
+        timings.mark("uploads")
+
+        if sink: # offline: read the frame back, no presenting and no pacing.
+            sink(renderer.to_surface(area=(0, 0, *settings.resolution)))
+            if remote:
+                remote.presented()
+            timings.mark("present")
+        else:
+            if recorder: # reads the buffer back, so before switching to the window.
+                recorder.capture(renderer, (0, 0, *settings.resolution), 1 / settings.fps)
+                timings.mark("record")
+            renderer.target = None
+            buffer.draw(srcrect=(0, 0, *settings.resolution), dstrect=(0, 0, *settings.resolution)) # buffer may be larger.
+            timings.draw() # on the window, so never part of the buffer.
+            renderer.present() 
+            if remote:
+                remote.presented()
+            timings.mark("present")
+            if frame == 0:
+                print(f"Time to first frame: {time.perf_counter() - launched:.2f} s.")
+            clock.tick(settings.fps)
+            timings.mark("pacing")
+        timings.end_frame()
+
+        frame += 1
+        if frame == frames:
+            if recorder:
+                recorder.close()
+            timings.close()
+            return
 
 def delete_old_textfiles(directory, dirnames):
     files = [file for file in os.listdir(directory) if ".txt" in file]
@@ -480,49 +1055,95 @@ def delete_old_textfiles(directory, dirnames):
         if filename[:-4] not in dirnames:
             os.remove(directory + filename)
 
-# STARTUP CONFIGURATION - directory choice and resolution.
 # you want to put all the image directories into ./pics, 'tmp' ignored.
+def find_image_directories(hub_path):
+    return [i for i in os.listdir(hub_path) if os.path.isdir(hub_path + i) and i != "tmp" and i != "overlays"]
+
+# STARTUP CONFIGURATION - directory choice and resolution, from the command line or asked for.
+#     python subtitler.py eyes --resolution 1080 --fps 60 --fullscreen --cues show.csv
 if __name__ == "__main__":
 
-    possible_directories = []
+    parser = argparse.ArgumentParser(description="Flickering image tiles with subtitles and effects.")
+    parser.add_argument("directory", nargs="?", help="image directory in ./pics, by name or number. asked for if left out")
+    parser.add_argument("--resolution", type=int, help="height in pixels, always 16:9. asked for if left out")
+    parser.add_argument("--fps", type=int, default=144)
+    parser.add_argument("--fullscreen", action="store_true")
+    parser.add_argument("--cues", help="cue file (.csv or .json) to drive the show, see cues.py")
+    parser.add_argument("--seek", type=cues.parse_time, default=0, help="start the cue file here, e.g. 1:02:00")
+    parser.add_argument("--profile-csv", help="write per-frame phase timings here, see profiler.py")
+    parser.add_argument("--workers", type=int, help="threads decoding the image set, default one per CPU")
+    parser.add_argument("--pixel-cache", action="store_true", help="keep decoded images in .cache/pixels for faster loads")
+    parser.add_argument("--control", type=int, metavar="PORT", help="accept commands on this localhost port, see control.py")
+    parser.add_argument("--record", metavar="DIR", help="record the show as it is presented into this directory, see recorder.py")
+    parser.add_argument("--record-format", choices=("raw", "png"), default="raw")
+    parser.add_argument("--record-every", type=int, default=1, metavar="N", help="record every Nth frame")
+    args = parser.parse_args()
+    if args.pixel_cache:
+        asset_cache.pixel_cache = asset_cache.PixelCache()
+
     hub_path = os.path.dirname(os.path.realpath(__file__)) + "/pics/"
     dir_names = os.listdir(hub_path)
-    for i in dir_names:
-        if os.path.isdir(hub_path + i) and i != "tmp" and i != "overlays":
-            possible_directories.append(i)
-    print("#" * 40)
-    print("# Available directories:" + " "*15 + "#")
-    for i, name in enumerate(possible_directories):
-        print("# {:1}. {:33} #".format(i + 1, name))
-    print("#" * 40)
+    possible_directories = find_image_directories(hub_path)
+    if args.directory is None or args.resolution is None:
+        print("#" * 40)
+        print("# Available directories:" + " "*15 + "#")
+        for i, name in enumerate(possible_directories):
+            print("# {:1}. {:33} #".format(i + 1, name))
+        print("#" * 40)
 
     while "entering config":
         try:
-            dir_choice = input("Directory\n> ") # name or number
-            res_choice = input("Resolution\n> ") # width, always 16:9
+            dir_choice = args.directory if args.directory is not None else input("Directory\n> ") # name or number
+            res_choice = args.resolution if args.resolution is not None else input("Resolution\n> ") # width, always 16:9
             resolution = (int(res_choice)*16//9, int(res_choice))
 
             if dir_choice.isnumeric():
-                settings = Settings(possible_directories[int(dir_choice)-1], resolution)
-                settings.current_index = int(dir_choice) - 1
+                index = int(dir_choice) - 1
             else:
-                tmp_index = possible_directories.index(dir_choice)
-                settings = Settings(possible_directories[tmp_index], resolution)
-                settings.current_index = tmp_index
+                index = possible_directories.index(dir_choice)
+            settings = Settings(possible_directories[index], resolution, args.workers)
+            settings.current_index = index
             settings.directory_list = possible_directories
             break
 
+        except EOFError: # nothing to ask, e.g. started from a script without arguments.
+            sys.exit(1)
+
         except IndexError:
             print(f"The image directory is empty.")
+            if args.directory is not None:
+                sys.exit(1)
 
         except Exception as e:
             print(f"Incorrect input: {e}.")
+            if args.directory is not None and args.resolution is not None:
+                sys.exit(1)
+        args.directory = args.resolution = None # ask instead.
+
+    settings.fps = args.fps
+    settings.refresh_rng_value()
+    settings.fullscreen = args.fullscreen
+    settings.profile_csv = args.profile_csv
+
+    timeline = cues.CueTimeline.load(args.cues) if args.cues else None
+    if timeline:
+        timeline.seek(args.seek)
 
     screen = pygame._sdl2.Window("...", size=resolution, resizable=True)
+    if settings.fullscreen:
+        screen.set_fullscreen()
 
     delete_old_textfiles(hub_path, dir_names)
     print("Current resolution: %s x %s" %(settings.resolution))
     renderer = pygame._sdl2.Renderer(screen, vsync=True)
  
+    remote = None
+    if args.control:
+        remote = control.ControlServer(args.control)
+        remote.start()
+    recorder = None
+    if args.record:
+        recorder = Recorder(args.record, args.record_format, args.record_every)
+
     pygame.init()
-    main(settings, screen, renderer)
\ No newline at end of file
+    main(settings, screen, renderer, timeline=timeline, remote=remote, recorder=recorder)
\ No newline at end of file